@@ -0,0 +1,61 @@
+"""Check GhostAccumulator against the original per-frame loop.
+
+    python AccumulatorCheck.py [memory ...]
+
+Pushes random motion masks through the accumulator, well past the point
+where the ring wraps, and compares its layer with the loop the sketch used
+to run over every stored mask (ghost += mask * (1 - age / count)). The loop
+is only evaluated on a handful of frames so long memories stay quick, and
+in float64, since summing thousands of float32 planes drifts on its own.
+Exits non-zero on any mismatch. No window or camera needed.
+"""
+import sys
+import numpy as np
+
+from Ghosts import GhostAccumulator
+
+H, W = 24, 40
+MEMORIES = (30, 120, 255, 256, 300, 3000)
+TOLERANCE = 1e-6             # relative to the layer's peak
+
+
+def reference_layer(masks, memory):
+    # the original loop over the last `memory` masks, newest first
+    recent = masks[-memory:]
+    count = len(recent)
+    ghost = np.zeros((H, W), dtype=np.float64)
+    for age, mask in enumerate(reversed(recent)):
+        ghost += (mask / 255.0) * (1.0 - age / count)
+    return ghost
+
+
+def check(memory, rng):
+    acc = GhostAccumulator(memory, H, W)
+    frames = 2 * memory + 17
+    checkpoints = {1, memory - 1, memory, memory + 1, frames} | set(range(memory // 2, frames, max(1, memory // 3)))
+    masks = []
+    worst = 0.0
+    for frame in range(1, frames + 1):
+        mask = (rng.random((H, W)) < 0.3).astype(np.uint8) * 255
+        masks.append(mask)
+        acc.push(mask)
+        if frame in checkpoints:
+            ref = reference_layer(masks, memory)
+            worst = max(worst, float(np.abs(acc.layer() - ref).max() / max(1.0, ref.max())))
+    return frames, worst
+
+
+def main():
+    memories = [int(m) for m in sys.argv[1:]] or MEMORIES
+    rng = np.random.default_rng(11)
+    failed = False
+    for memory in memories:
+        frames, worst = check(memory, rng)
+        ok = worst <= TOLERANCE
+        failed |= not ok
+        print(f"memory {memory:>5}: {frames} frames, max relative diff {worst:.1e} {'ok' if ok else 'MISMATCH'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,97 +1,304 @@
 import atexit
+import os
+import sys
 import cv2
 import numpy as np
-from dorothy import Dorothy
+try:
+    from dorothy import Dorothy
+except ImportError:
+    # headless batch runs (GhostsBatch.py) only need GhostPipeline
+    Dorothy = None
+
+from capture import CameraStream
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sketch_profiler import FrameProfiler
 
 WINDOW_SIZE = 30              # ring buffer length
 BG_ALPHA = 0.02               # EMA learning rate
 MOVEMENT_THRESHOLD = 30       # binary threshold for motion detection
 GHOST_STRENGTH = 0.6          # opacity of ghost layer
-CAMERA_INDEX = 0
+GHOST_COLOUR = (255, 255, 255)  # RGB the ghosts pull toward
+GHOST_BLEND = "lerp"          # "lerp" (fade toward colour), "add" or "screen"
+CAMERA_INDEX = 0              # or a video file path for repeatable runs
+ANALYSIS_SCALE = 1.0          # motion model resolution vs canvas (0.5 / 0.25 on slow PCs)
+PROFILE = False               # time each stage, dump ghosts_timing.csv/.json on exit
+PROFILE_OVERLAY = True        # ...and show recent stage times on the canvas
 
 
-class TemporalGhosts:
-    def __init__(self, dot: Dorothy, memory: int):
-        self.dot = dot
+class PackedMaskRing:
+    """Ring buffer of binary masks stored 8 pixels per byte (np.packbits).
+
+    Same ptr/count semantics as a plain (memory, h, w) uint8 ring at 1/8 of
+    the memory; masks are only unpacked when something asks for one.
+    """
+
+    def __init__(self, memory: int, h: int, w: int):
         self.memory = memory
+        self.h = h
+        self.w = w
+        self.packed = np.zeros((memory, h, (w + 7) // 8), dtype=np.uint8)
+        self.ptr = 0            # next slot to write
+        self.count = 0          # masks stored so far
 
-        self.cap = cv2.VideoCapture(CAMERA_INDEX)
-        self.w = dot.width
-        self.h = dot.height
+    def push(self, mask: np.ndarray):
+        # any non-zero pixel becomes a set bit
+        self.packed[self.ptr] = np.packbits(mask, axis=-1)
+        self.ptr = (self.ptr + 1) % self.memory
+        self.count = min(self.count + 1, self.memory)
+
+    def get(self, age: int) -> np.ndarray:
+        # 0/1 mask from `age` frames ago (0 = newest)
+        index = (self.ptr - 1 - age) % self.memory
+        return np.unpackbits(self.packed[index], axis=-1, count=self.w)
+
+    def oldest(self) -> np.ndarray:
+        return self.get(self.count - 1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.packed.nbytes
+
+
+class GhostAccumulator:
+    """Packed mask ring plus running sums for the age-weighted ghost.
+
+    The ghost is sum_i mask_i * (1 - i / count), i = age in frames. Kept as
+    total = sum mask_i and aged = sum i * mask_i it is total - aged / count,
+    and a new frame only shifts both sums, so each push costs a handful of
+    full-frame operations however long the memory is. Sums are integer, so
+    nothing drifts, and only the mask falling off the end is ever unpacked.
+    """
+
+    def __init__(self, memory: int, h: int, w: int):
+        self.memory = memory
+
+        # ring buffer of past masks, bit-packed
+        self.ring = PackedMaskRing(memory, h, w)
+
+        # running sums + preallocated scratch
+        self.total = np.zeros((h, w), dtype=np.int32)
+        self.aged = np.zeros((h, w), dtype=np.int32)
+        self.scratch = np.zeros((h, w), dtype=np.int32)
+        self.mask01 = np.zeros((h, w), dtype=np.uint8)
+        self.ghost = np.zeros((h, w), dtype=np.float32)
+
+    @property
+    def ptr(self) -> int:
+        return self.ring.ptr
+
+    @property
+    def count(self) -> int:
+        return self.ring.count
+
+    def push(self, mask: np.ndarray):
+        # every stored mask gets one frame older
+        self.aged += self.total
+
+        # drop the oldest mask once the ring is full (it just reached age = memory)
+        if self.count == self.memory:
+            old = self.ring.oldest()
+            self.total -= old
+            np.multiply(old, self.memory, out=self.scratch, dtype=np.int32)
+            self.aged -= self.scratch
+
+        # write new mask (age 0) into ring buffer
+        np.minimum(mask, 1, out=self.mask01)
+        self.total += self.mask01
+        self.ring.push(self.mask01)
+
+    def layer(self) -> np.ndarray:
+        # age weighted ghost layer = (total * count - aged) / count, reused buffer
+        if self.count == 0:
+            self.ghost.fill(0.0)
+            return self.ghost
+        np.multiply(self.total, self.count, out=self.scratch)
+        self.scratch -= self.aged
+        np.multiply(self.scratch, 1.0 / self.count, out=self.ghost, casting="unsafe")
+        return self.ghost
+
+    @property
+    def nbytes(self) -> int:
+        # ring + sums + scratch planes
+        planes = self.total.nbytes + self.aged.nbytes + self.scratch.nbytes
+        return self.ring.nbytes + planes + self.mask01.nbytes + self.ghost.nbytes
+
+
+class GhostCompositor:
+    """Blends the ghost layer over the frame in preallocated uint8 buffers.
+
+    Alpha is quantised to 0..255 once per frame and the blend runs in cv2's
+    saturating uint8 arithmetic, so a frame allocates nothing. Modes, with
+    a = alpha / 255 and c = GHOST_COLOUR:
+
+        lerp    rgb + a * (c - rgb)      the original fade (c = white)
+        add     rgb + a * c              glowing, saturates to c
+        screen  1 - (1 - rgb)(1 - a*c)   softer glow
+    """
 
-        # ring buffer of past masks
-        self.motion_buffer = np.zeros(
-            (self.memory, self.h, self.w), dtype=np.uint8
-        )
-        self.ptr = 0
-        self.count = 0
+    MODES = ("lerp", "add", "screen")
+
+    def __init__(self, h: int, w: int, strength: float = GHOST_STRENGTH,
+                 colour=GHOST_COLOUR, mode: str = GHOST_BLEND):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown blend mode {mode!r}, expected one of {self.MODES}")
+        self.strength = strength
+        self.mode = mode
+
+        # solid colour plane, plus reused per-frame buffers
+        self.colour = np.empty((h, w, 3), dtype=np.uint8)
+        self.colour[:] = colour
+        self.alpha = np.empty((h, w), dtype=np.uint8)
+        self.alpha3 = np.empty((h, w, 3), dtype=np.uint8)
+        self.tmp = np.empty((h, w, 3), dtype=np.uint8)
+        self.ghost = np.empty((h, w, 3), dtype=np.uint8)
+        self.out = np.empty((h, w, 3), dtype=np.uint8)
+
+    def compose(self, rgb: np.ndarray, ghost_layer: np.ndarray) -> np.ndarray:
+        # ghost intensity → 0..255 alpha, capped at strength (ghost_layer is overwritten)
+        np.minimum(ghost_layer, 1.0, out=ghost_layer)
+        cv2.convertScaleAbs(ghost_layer, self.alpha, 255.0 * self.strength)
+        cv2.merge((self.alpha, self.alpha, self.alpha), self.alpha3)
+
+        # ghost colour scaled by alpha: a * c
+        cv2.multiply(self.colour, self.alpha3, self.ghost, 1.0 / 255)
+
+        if self.mode == "lerp":
+            # rgb * (1 - a) + a * c
+            cv2.bitwise_not(self.alpha3, self.tmp)
+            cv2.multiply(rgb, self.tmp, self.tmp, 1.0 / 255)
+            cv2.add(self.tmp, self.ghost, self.out)
+        elif self.mode == "add":
+            cv2.add(rgb, self.ghost, self.out)
+        else:
+            # screen: invert, multiply, invert back
+            cv2.bitwise_not(rgb, self.tmp)
+            cv2.bitwise_not(self.ghost, self.ghost)
+            cv2.multiply(self.tmp, self.ghost, self.tmp, 1.0 / 255)
+            cv2.bitwise_not(self.tmp, self.out)
+        return self.out
+
+
+class GhostPipeline:
+    """One frame in, one ghosted RGB frame out: background model → mask → memory → blend.
+
+    The background model, motion mask and mask memory run at `scale` times
+    the canvas size; only the final ghost layer is upsampled (it is soft
+    anyway), and the blend happens at full resolution. colour and mode pick
+    the ghost colour and blend (see GhostCompositor).
+    """
+
+    def __init__(self, w: int, h: int, memory: int, scale: float = ANALYSIS_SCALE,
+                 profiler: FrameProfiler = None, colour=GHOST_COLOUR, mode: str = GHOST_BLEND):
+        self.profiler = profiler or FrameProfiler("ghosts", enabled=False)
+        self.w = w
+        self.h = h
+        self.scale = scale
+        self.aw = max(1, int(round(w * scale)))
+        self.ah = max(1, int(round(h * scale)))
+
+        # keep the median filter about the same size on the canvas
+        self.median = int(round(5 * scale)) | 1
+
+        # ring buffer of past masks + running ghost sums, at analysis size
+        self.ghosts = GhostAccumulator(memory, self.ah, self.aw)
+
+        # ghost blend, working in its own preallocated buffers
+        self.compositor = GhostCompositor(h, w, colour=colour, mode=mode)
+        self.ghost_full = np.empty((h, w), dtype=np.float32)
 
         # background model (initialized on first frame)
         self.background = None
 
-    def setup(self):
-        # set solid black canvas background
-        self.dot.background((0, 0, 0))
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        with self.profiler.stage("background"):
+            rgb, mask = self.motion_mask(frame)
 
-    def draw(self):
-        ret, frame = self.cap.read()
+        with self.profiler.stage("accumulate"):
+            # write new mask into ring buffer, update the running sums
+            self.ghosts.push(mask)
 
-        # grab live frame and resize to canvas
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        rgb = cv2.resize(rgb, (self.w, self.h))
+            # age weighted ghost layer, upsampled to the canvas if needed
+            ghost_layer = self.ghosts.layer()
+            if self.scale != 1:
+                ghost_layer = cv2.resize(ghost_layer, (self.w, self.h), self.ghost_full,
+                                         interpolation=cv2.INTER_LINEAR)
+
+        with self.profiler.stage("composite"):
+            # blend toward the ghost colour
+            return self.compositor.compose(rgb, ghost_layer)
+
+    def motion_mask(self, frame: np.ndarray):
+        # resize live frame to canvas and convert to RGB
+        rgb = cv2.resize(frame, (self.w, self.h))
+        rgb = cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB)
+
+        # motion analysis works on a smaller copy
+        small = rgb
+        if self.scale != 1:
+            small = cv2.resize(rgb, (self.aw, self.ah), interpolation=cv2.INTER_AREA)
 
         # seed background model
         if self.background is None:
-            self.background = rgb.astype(np.float32)
+            self.background = small.astype(np.float32)
 
         # update exponential moving-average background
-        cv2.accumulateWeighted(rgb, self.background, BG_ALPHA)
+        cv2.accumulateWeighted(small, self.background, BG_ALPHA)
         bg_uint8 = self.background.astype(np.uint8)
 
         # motion = abs difference from EMA background
-        diff = cv2.absdiff(rgb, bg_uint8)
+        diff = cv2.absdiff(small, bg_uint8)
         gray = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
 
         # threshold to binary motion mask
         _, mask = cv2.threshold(gray, MOVEMENT_THRESHOLD, 255, cv2.THRESH_BINARY)
 
         # remove isolated noise pixels
-        mask = cv2.medianBlur(mask, 5)
+        if self.median > 1:
+            mask = cv2.medianBlur(mask, self.median)
+        return rgb, mask
 
-        # write new mask into ring buffer
-        self.motion_buffer[self.ptr] = mask
-        self.ptr = (self.ptr + 1) % self.memory
-        self.count = min(self.count + 1, self.memory)
 
-        # age weighted ghost layer 
-        ghost_layer = np.zeros((self.h, self.w), dtype=np.float32)
-        for i in range(self.count):
-            index = (self.ptr - 1 - i) % self.memory
-            age_factor = 1.0 - (i / self.count)
-            ghost_layer += (self.motion_buffer[index] / 255.0) * age_factor
+class TemporalGhosts:
+    def __init__(self, dot: Dorothy, memory: int):
+        self.dot = dot
+        self.memory = memory
+
+        # camera is read on its own thread; draw() just takes the newest frame
+        self.cap = CameraStream(CAMERA_INDEX)
+        self.w = dot.width
+        self.h = dot.height
 
-        ghost_layer = np.clip(ghost_layer, 0.0, 1.0)
+        # per-stage timing (a no-op unless PROFILE is on)
+        self.profiler = FrameProfiler("ghosts", PROFILE, PROFILE_OVERLAY)
 
-        # ghost intensity → alpha mask
-        ghost_alpha = np.clip(
-            ghost_layer * GHOST_STRENGTH,
-            0.0,
-            GHOST_STRENGTH
-        )[..., None]
+        # background model, ghost memory and blend
+        self.pipeline = GhostPipeline(self.w, self.h, self.memory, profiler=self.profiler)
+        p = self.pipeline
+        unpacked = self.memory * p.ah * p.aw
+        print(f"[GHOSTS] {self.memory} frames of memory at {p.aw}x{p.ah}: {p.ghosts.nbytes / 2**20:.1f} MB "
+              f"(unpacked ring alone would be {unpacked / 2**20:.1f} MB)")
 
-        # blend based on ghost alpha
-        base = rgb.astype(np.float32)
-        white = np.full_like(base, 255.0, dtype=np.float32)
+    def setup(self):
+        # set solid black canvas background
+        self.dot.background((0, 0, 0))
 
-        blended = ((1.0 - ghost_alpha) * base + ghost_alpha * white).astype(np.uint8)
+    def draw(self):
+        with self.profiler.stage("capture"):
+            frame = self.cap.latest()
+        if frame is None:
+            # camera hasn't delivered yet
+            return
 
         # display result
-        self.dot.canvas = blended
+        self.dot.canvas = self.pipeline(frame)
 
     def close(self):
         # release webcam safely
         if self.cap:
+            print("[CAPTURE]", self.cap.stats())
             self.cap.release()
+            self.cap = None
 
 def main():
         dot = Dorothy(width=960, height=540)
@@ -109,7 +316,7 @@ def main():
         dot.on_exit = on_exit
         atexit.register(on_exit)
 
-        dot.start_loop(setup, draw)
+        dot.start_loop(*sketch.profiler.wrap(dot, setup, draw))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,89 @@
+"""Render the ghost effect over a video file headlessly, as fast as the CPU allows.
+
+    python GhostsBatch.py input.mp4 output.mp4 [--scale 0.5] [--size 1920x1080] [--memory 30]
+                          [--colour 255,120,0] [--blend add]
+
+Same GhostPipeline as the live sketch, but frames come from the file in
+order (none dropped, no pacing) and go to an encoder instead of a window.
+Decoding and encoding run on their own threads (sketch_profiler.run_frames)
+so the ghost stage never waits on either; if either fails, the others stop
+and the error is raised from render(). Prints throughput at the end.
+"""
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sketch_profiler import run_frames
+
+from Ghosts import ANALYSIS_SCALE, GHOST_BLEND, GHOST_COLOUR, WINDOW_SIZE, GhostCompositor, GhostPipeline
+
+QUEUE_SIZE = 8                # frames buffered between the stages
+
+
+def size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def colour(text):
+    r, g, b = (int(c) for c in text.split(","))
+    return r, g, b
+
+
+def render(input_video, output_video, memory=WINDOW_SIZE, scale=ANALYSIS_SCALE, out_size=None,
+           ghost_colour=GHOST_COLOUR, blend=GHOST_BLEND):
+    cap = cv2.VideoCapture(input_video)
+    if not cap.isOpened():
+        raise SystemExit(f"could not open {input_video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # default: keep the footage's own resolution
+    w, h = out_size or (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    pipeline = GhostPipeline(w, h, memory, scale, colour=ghost_colour, mode=blend)
+    writer = cv2.VideoWriter(output_video, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+
+    # pipeline output is RGB in a reused buffer; run_frames queues a copy of the BGR one
+    bgr = np.empty((h, w, 3), dtype=np.uint8)
+
+    def process(frame):
+        return cv2.cvtColor(pipeline(frame), cv2.COLOR_RGB2BGR, dst=bgr)
+
+    def progress(count):
+        if count % 250 == 0:
+            print(f"[BATCH] {count}/{total} frames")
+
+    start = time.perf_counter()
+    try:
+        count = run_frames(cap, writer, process, queue_size=QUEUE_SIZE, report=False, progress=progress)
+    finally:
+        cap.release()
+        writer.release()
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"[BATCH] {count} frames at {w}x{h} in {elapsed:.1f}s: {rate:.1f} fps "
+          f"({rate / fps:.2f}x real time), analysis scale {scale}")
+    print("[DONE] Saved:", output_video)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render Ghosts over a video file without a window")
+    parser.add_argument("input", help="input video")
+    parser.add_argument("output", help="output .mp4")
+    parser.add_argument("--memory", type=int, default=WINDOW_SIZE, help="ghost memory in frames")
+    parser.add_argument("--scale", type=float, default=ANALYSIS_SCALE, help="motion analysis scale (1, 0.5, 0.25)")
+    parser.add_argument("--size", type=size, help="output WxH (default: input size)")
+    parser.add_argument("--colour", type=colour, default=GHOST_COLOUR, help="ghost colour as R,G,B (default: white)")
+    parser.add_argument("--blend", choices=GhostCompositor.MODES, default=GHOST_BLEND, help="ghost blend mode")
+    args = parser.parse_args()
+    render(args.input, args.output, args.memory, args.scale, args.size, args.colour, args.blend)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Quality vs speed of ANALYSIS_SCALE on a recorded clip.
+
+    python ScaleComparison.py clip.mp4 [frames] [--colour 255,120,0] [--blend add]
+
+Runs the ghost pipeline at full, 1/2 and 1/4 analysis resolution over the
+same frames and prints ms per frame next to how far each output is from
+the full-resolution one (mean absolute difference in 0-255 levels, and
+PSNR). No window or camera needed.
+"""
+import argparse
+import sys
+import time
+import cv2
+import numpy as np
+
+from Ghosts import GHOST_BLEND, GHOST_COLOUR, WINDOW_SIZE, GhostCompositor, GhostPipeline
+from GhostsBatch import colour
+
+CANVAS_W, CANVAS_H = 960, 540
+SCALES = (1.0, 0.5, 0.25)
+
+
+def load_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run(frames, scale, ghost_colour=GHOST_COLOUR, blend=GHOST_BLEND):
+    pipeline = GhostPipeline(CANVAS_W, CANVAS_H, WINDOW_SIZE, scale, colour=ghost_colour, mode=blend)
+    outputs = []
+    start = time.perf_counter()
+    for frame in frames:
+        outputs.append(pipeline(frame).copy())
+    elapsed = time.perf_counter() - start
+    return outputs, 1000.0 * elapsed / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ANALYSIS_SCALE settings on a recorded clip")
+    parser.add_argument("clip", help="input video")
+    parser.add_argument("frames", type=int, nargs="?", default=300, help="frames to use")
+    parser.add_argument("--colour", type=colour, default=GHOST_COLOUR, help="ghost colour as R,G,B (default: white)")
+    parser.add_argument("--blend", choices=GhostCompositor.MODES, default=GHOST_BLEND, help="ghost blend mode")
+    args = parser.parse_args()
+    frames = load_frames(args.clip, args.frames)
+    if not frames:
+        sys.exit(f"no frames read from {args.clip}")
+
+    reference = None
+    print(f"{len(frames)} frames, canvas {CANVAS_W}x{CANVAS_H}, memory {WINDOW_SIZE}")
+    print(f"{'scale':>6} {'ms/frame':>9} {'speed-up':>9} {'mean |diff|':>12} {'PSNR dB':>8}")
+    for scale in SCALES:
+        outputs, ms = run(frames, scale, args.colour, args.blend)
+        if reference is None:
+            reference, base_ms = outputs, ms
+        diffs = [cv2.absdiff(a, b) for a, b in zip(outputs, reference)]
+        mad = float(np.mean([d.mean() for d in diffs]))
+        mse = float(np.mean([np.mean(d.astype(np.float32) ** 2) for d in diffs]))
+        psnr = float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+        print(f"{scale:>6} {ms:>9.2f} {base_ms / ms:>8.2f}x {mad:>12.2f} {psnr:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import threading
+import time
+import cv2
+
+
+class CameraStream:
+    """Reads a camera (or video file) on a background thread, keeping only the newest frame.
+
+    The capture thread decodes into a back buffer and swaps it with the
+    shared "ready" slot; latest() swaps the ready slot with the caller's
+    front buffer if something new arrived. Nobody waits on anybody and no
+    frame is copied, and the array latest() returns stays untouched until
+    the next call.
+
+    dropped    frames captured but replaced before the draw loop took them
+    duplicated latest() calls that got the same frame as last time
+
+    A file source is paced at its own fps by default (pace=True) so runs are
+    repeatable; pace=False reads it as fast as it decodes.
+    """
+
+    def __init__(self, source=0, pace=None):
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"could not open capture source {source!r}")
+
+        # files are paced to their frame rate unless told otherwise
+        is_file = isinstance(source, str)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.period = 1.0 / fps if (is_file if pace is None else pace) else 0.0
+
+        self.back = self.ready = self.front = None
+        self.fresh = False
+        self.seq = 0            # frames captured
+        self.dropped = 0
+        self.duplicated = 0
+        self.finished = False   # source ran out (or failed)
+
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="camera-stream", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while not self.stop.is_set():
+            # decode straight into the back buffer once it exists
+            ok, frame = self.cap.read(self.back)
+            if not ok:
+                break
+
+            with self.lock:
+                self.back, self.ready = self.ready, frame
+                if self.fresh:
+                    self.dropped += 1
+                self.fresh = True
+                self.seq += 1
+
+            if self.period:
+                next_time += self.period
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.perf_counter()
+        self.finished = True
+
+    def latest(self):
+        """Newest frame (BGR), or None before the first one arrives. Never blocks."""
+        with self.lock:
+            if self.fresh:
+                self.front, self.ready = self.ready, self.front
+                self.fresh = False
+            elif self.front is not None:
+                self.duplicated += 1
+        return self.front
+
+    def wait_first(self, timeout=5.0):
+        # block until the first frame is in (or the source gave up)
+        end = time.perf_counter() + timeout
+        while self.seq == 0 and not self.finished and time.perf_counter() < end:
+            time.sleep(0.005)
+        return self.latest()
+
+    def stats(self):
+        return {"captured": self.seq, "dropped": self.dropped, "duplicated": self.duplicated}
+
+    def release(self):
+        self.stop.set()
+        self.thread.join(timeout=1.0)
+        self.cap.release()
@@ -0,0 +1,98 @@
+"""Bounce Sequence Store patterns to WAV without a window or audio device.
+
+    python Bounce.py beat.wav --bpm 110 --bars 4 KICK=x...x... SNARE=..x...x. HIHAT=xxxxxxxx
+    python Bounce.py out_dir --patterns patterns.json
+
+A row is NAME=steps, where x or 1 is a hit, X an accent (full velocity),
+? a hit that plays half the time, and anything else is a rest; unnamed
+instruments stay silent. A bar is one pass through the steps. The
+patterns file is a JSON list of {"name", "bpm", "bars", "rows": {NAME: steps}}
+and each one is written to <out_dir>/<name>.wav.
+
+Audio comes from the same SimpleSampler + StepClock as the live sketch,
+pulled block by block as fast as it mixes, so the output is deterministic
+(and identical for any --block size).
+"""
+import argparse
+import json
+import os
+import time
+import wave
+
+import numpy as np
+
+from pattern import DEFAULT_VELOCITY, Pattern
+from sampler import KIT_NAMES, build_sample_pack, render_pattern
+
+
+STEP_CODES = {"x": (DEFAULT_VELOCITY, 1.0), "1": (DEFAULT_VELOCITY, 1.0), "X": (1.0, 1.0), "?": (DEFAULT_VELOCITY, 0.5)}
+
+
+def parse_rows(rows, seed=None):
+    # {"KICK": "x...x..."} -> Pattern with one track per kit sound
+    names = {name.upper(): steps for name, steps in rows.items()}
+    unknown = set(names) - set(KIT_NAMES)
+    if unknown:
+        raise SystemExit(f"unknown instrument(s) {', '.join(sorted(unknown))}; pick from {', '.join(KIT_NAMES)}")
+    step_count = max((len(steps) for steps in names.values()), default=8)
+    pattern = Pattern(len(KIT_NAMES), step_count, seed)
+    for track, name in enumerate(KIT_NAMES):
+        for step, ch in enumerate(names.get(name, "")):
+            if ch in STEP_CODES:
+                pattern.set(track, step, *STEP_CODES[ch])
+    return pattern
+
+
+def write_wav(path, audio, sample_rate):
+    # mono 16-bit PCM
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as fh:
+        fh.setnchannels(1)
+        fh.setsampwidth(2)
+        fh.setframerate(sample_rate)
+        fh.writeframes(pcm.tobytes())
+
+
+def bounce(path, pattern, bpm, bars, sample_rate, block_size, tail, samples):
+    start = time.perf_counter()
+    audio = render_pattern(pattern, bpm, bars, sample_rate, block_size, tail=tail, samples=samples)
+    elapsed = time.perf_counter() - start
+    write_wav(path, audio, sample_rate)
+    seconds = audio.size / sample_rate
+    print(f"[BOUNCE] {path}: {seconds:.2f} s of audio in {elapsed * 1000:.0f} ms "
+          f"({seconds / max(elapsed, 1e-9):.0f}x real time)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="WAV file, or a directory with --patterns")
+    parser.add_argument("rows", nargs="*", help="NAME=steps, e.g. KICK=x...x...")
+    parser.add_argument("--bpm", type=float, default=110)
+    parser.add_argument("--bars", type=int, default=4)
+    parser.add_argument("--patterns", help="JSON list of patterns to bounce in one go")
+    parser.add_argument("--sample-rate", type=int, default=22050)
+    parser.add_argument("--block", type=int, default=1024, help="frames mixed per block")
+    parser.add_argument("--seed", type=int, default=0, help="seed for ? steps, so bounces repeat")
+    parser.add_argument("--no-tail", action="store_true", help="cut at the loop end instead of letting hits ring out")
+    args = parser.parse_intermixed_args()
+
+    # the kit is built once and shared by every pattern
+    samples = build_sample_pack(args.sample_rate)
+    tail = not args.no_tail
+
+    if args.patterns:
+        with open(args.patterns) as fh:
+            patterns = json.load(fh)
+        os.makedirs(args.output, exist_ok=True)
+        for pattern in patterns:
+            path = os.path.join(args.output, f"{pattern['name']}.wav")
+            bounce(path, parse_rows(pattern["rows"], args.seed), pattern.get("bpm", args.bpm), pattern.get("bars", args.bars),
+                   args.sample_rate, args.block, tail, samples)
+        return
+
+    rows = dict(row.split("=", 1) for row in args.rows)
+    bounce(args.output, parse_rows(rows, args.seed), args.bpm, args.bars, args.sample_rate, args.block, tail, samples)
+
+
+if __name__ == "__main__":
+    main()
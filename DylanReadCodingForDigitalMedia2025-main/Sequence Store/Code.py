@@ -1,111 +1,17 @@
+import atexit
+import os
+import sys
 from typing import Dict, List, Tuple
 
 import numpy as np
 
 from dorothy import Dorothy
 
-# Audio engine and sample preparation
-class SimpleSampler:
-    def __init__(self, dot: Dorothy, sample_rate: int = 22050, buffer_size: int = 128):
-        # Each index holds one drum sample, its playback head, and gain
-        self.samples: List[np.ndarray] = []
-        self.positions: List[int] = []
-        self.gains: List[float] = []
-
-        def get_frame(size: int) -> np.ndarray:
-            # Mixes any active sample slices into the outgoing buffer
-            audio = np.zeros(size, dtype=np.float32)
-            for idx, pos in enumerate(self.positions):
-                if pos < 0:
-                    continue
-                sample = self.samples[idx]
-                end = min(pos + size, len(sample))
-                chunk = sample[pos:end] * self.gains[idx]
-                audio[: len(chunk)] += chunk
-                self.positions[idx] = -1 if end >= len(sample) else end
-                if self.positions[idx] == -1:
-                    self.gains[idx] = 0.0
-            return np.clip(audio, -1.0, 1.0)
-
-        dot.music.start_dsp_stream(get_frame, sr=sample_rate, buffer_size=buffer_size, analyse=True)
-
-    def set_samples(self, sample_list: List[np.ndarray]) -> None:
-        self.samples = [np.asarray(sample, dtype=np.float32) for sample in sample_list]
-        self.positions = [-1 for _ in self.samples]
-        self.gains = [0.0 for _ in self.samples]
-
-    def trigger(self, index: int, velocity: float = 0.85) -> None:
-        if 0 <= index < len(self.samples):
-            self.positions[index] = 0
-            self.gains[index] = max(0.0, min(1.0, float(velocity)))
-
-
-def _exp_env(length: float, sr: int, decay: float) -> np.ndarray:
-    # Simple exponential decay envelope used across the drum kit sounds
-    steps = int(sr * length)
-    if steps <= 0:
-        return np.zeros(1, dtype=np.float32)
-    t = np.linspace(0.0, length, steps, endpoint=False)
-    return np.exp(-decay * t)
-
-
-def _normalize(sample: np.ndarray, peak: float = 0.8) -> np.ndarray:
-    # Keeps samples within a predictable level so they mix cleanly
-    sample = np.array(sample, dtype=np.float32)
-    max_val = float(np.max(np.abs(sample))) if sample.size else 0.0
-    if max_val > 0:
-        sample = sample * (peak / max_val)
-    return sample
-
-
-def build_sample_pack(sr: int) -> List[np.ndarray]:
-    # Procedurally builds a small drum kit so the sequencer can run standalone
-    rng = np.random.default_rng(404)
-    kit = []
-
-    env = _exp_env(0.45, sr, 6.2)
-    t = np.arange(env.size) / sr
-    sweep = 90.0 * np.exp(-6.0 * t) + 42.0
-    tone = np.sin(2 * np.pi * np.cumsum(sweep) / sr)
-    click = np.exp(-220 * t) * (rng.random(env.size) * 0.2)
-    kit.append(_normalize(tone * env + click, 0.86))
-
-    env = _exp_env(0.38, sr, 12.5)
-    t = np.arange(env.size) / sr
-    kit.append(_normalize(rng.normal(0.0, 1.0, env.size) * env * 0.8 + np.sin(2 * np.pi * 190 * t) * np.exp(-18 * t) * 0.4, 0.78))
-
-    env = _exp_env(0.18, sr, 28.0)
-    kit.append(_normalize(np.sign(rng.normal(0.0, 1.0, env.size)) * env * 0.6, 0.72))
-
-    env = _exp_env(0.32, sr, 16.0)
-    noise = rng.normal(0.0, 1.0, env.size)
-    pulse = np.zeros_like(noise)
-    for offset in (0, int(0.012 * sr), int(0.024 * sr)):
-        end = min(env.size, offset + int(0.02 * sr))
-        pulse[offset:end] += env[0 : end - offset]
-    kit.append(_normalize(noise * env * 0.45 + pulse * 0.5, 0.75))
-
-    env = _exp_env(0.46, sr, 7.0)
-    t = np.arange(env.size) / sr
-    kit.append(_normalize(np.sin(2 * np.pi * 140 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 2.2 * t)) * env, 0.82))
-
-    env = _exp_env(0.8, sr, 3.4)
-    base = rng.normal(0.0, 1.0, env.size)
-    kit.append(_normalize(np.convolve(base, np.ones(5) / 5, mode="same") * env * 0.55, 0.7))
-
-    env = _exp_env(0.36, sr, 10.5)
-    t = np.arange(env.size) / sr
-    kit.append(_normalize((np.sin(2 * np.pi * 540 * t) + 0.6 * np.sin(2 * np.pi * 810 * t)) * env, 0.8))
-
-    env = _exp_env(0.22, sr, 22.0)
-    noise = rng.normal(0.0, 1.0, env.size)
-    kit.append(_normalize(noise * env * (0.5 + 0.5 * np.sin(2 * np.pi * 16 * np.arange(env.size) / env.size)), 0.68))
-
-    env = _exp_env(1.2, sr, 1.8)
-    noise = rng.normal(0.0, 1.0, env.size)
-    kit.append(_normalize(np.convolve(noise, np.ones(12) / 12, mode="same") * env * 0.6, 0.72))
-
-    return kit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sketch_profiler import FrameProfiler
+
+from pattern import Pattern
+from sampler import KIT_NAMES, DrumKit, SimpleSampler, StepClock
 
 # UI constants and overall layout metrics 
 WIDTH, HEIGHT = 960, 675
@@ -121,20 +27,13 @@ BUTTON_TEXT_DARK = (22, 22, 22)
 
 # GRID_ROWS defines the instruments, STEP_COUNT controls loop length, and the
 # audio constants keep Dorothy + the sampler in sync.
-GRID_ROWS = [
-    "KICK",
-    "SNARE",
-    "HIHAT",
-    "CLAP",
-    "TOM",
-    "RIDE",
-    "COWBELL",
-    "SHAKER",
-    "CRASH",
-]
+GRID_ROWS = list(KIT_NAMES)
 STEP_COUNT = 8
 SAMPLE_RATE = 22050
 BUFFER_SIZE = 1024
+MAX_VOICES = 16               # simultaneous hits; the mixer's cost is fixed by this
+VOICE_STEALING = "oldest"     # when the pool is full: "oldest" or "quietest"
+LAZY_KIT = True               # build/load each drum the first time it's needed, not at startup
 
 LABEL_WIDTH = 170
 LABEL_GAP = 24
@@ -147,15 +46,24 @@ BUTTON_HEIGHT = 36
 BUTTON_GAP = 24
 
 bpm = 110
-step_millis = 60000.0 / bpm
 TAP_WINDOW = 4000
 
+# Frame timing: per-stage histograms, dumped to sequencer_timing.csv/.json on exit
+PROFILE = False
+PROFILE_OVERLAY = True
+profiler = FrameProfiler("sequencer", PROFILE, PROFILE_OVERLAY)
+
 dot = Dorothy(width=WIDTH, height=HEIGHT)
 dot.background(BACKGROUND)
 
 # Build the audio engine and hand it the procedurally generated drum kit
-sampler = SimpleSampler(dot, sample_rate=SAMPLE_RATE, buffer_size=BUFFER_SIZE)
-sampler.set_samples(build_sample_pack(SAMPLE_RATE))
+sampler = SimpleSampler(dot, sample_rate=SAMPLE_RATE, buffer_size=BUFFER_SIZE,
+                        max_voices=MAX_VOICES, stealing=VOICE_STEALING,
+                        samples=DrumKit(SAMPLE_RATE), lazy=LAZY_KIT)
+
+# Steps are scheduled by the audio callback, not the draw loop
+step_clock = StepClock(SAMPLE_RATE, bpm, STEP_COUNT, lambda step, offset: trigger_step(step, offset))
+sampler.on_block = step_clock
 
 GRID_WIDTH = 0
 GRID_HEIGHT = 0
@@ -215,39 +123,68 @@ FONT_5X7: Dict[str, Tuple[str, ...]] = {
 }
 
 
-def draw_text(message: str, pos: Tuple[int, int], colour: Tuple[int, int, int] = (220, 220, 220), scale: int = 4) -> None:
-    # Renders bitmap text by stamping scaled rectangles into the Dorothy canvas
-    x_cursor = int(pos[0])
-    y_cursor = int(pos[1])
-    dot.fill(colour)
-    chars = message.upper()
-    for idx, ch in enumerate(chars):
+# Rasterised glyphs and whole strings, built on first use and reused every frame
+TEXT_CACHE_LIMIT = 512
+glyph_cache: Dict[Tuple[str, int], np.ndarray] = {}
+text_cache: Dict[Tuple[str, int], np.ndarray] = {}
+
+
+def glyph_mask(ch: str, scale: int) -> np.ndarray:
+    # One 5x7 character as a boolean mask at `scale` pixels per font pixel
+    key = (ch, scale)
+    mask = glyph_cache.get(key)
+    if mask is None:
         glyph = FONT_5X7.get(ch, FONT_5X7[" "])
-        glyph_width = len(glyph[0])
-        for row, row_data in enumerate(glyph):
-            for col, bit in enumerate(row_data):
-                if bit != "1":
-                    continue
-                x0 = x_cursor + col * scale
-                y0 = y_cursor + row * scale
-                dot.rectangle((x0, y0), (x0 + scale, y0 + scale))
-        x_cursor += glyph_width * scale
-        if idx < len(chars) - 1:
-            x_cursor += scale
+        bits = np.array([[bit == "1" for bit in row] for row in glyph], dtype=bool)
+        mask = np.repeat(np.repeat(bits, scale, axis=0), scale, axis=1)
+        glyph_cache[key] = mask
+    return mask
+
+
+def text_mask(message: str, scale: int) -> np.ndarray:
+    # A whole string as one mask: glyphs side by side with a one-pixel (scaled)
+    # gap, widened by a pixel right/down like dot.rectangle's inclusive corners
+    chars = message.upper()
+    key = (chars, scale)
+    mask = text_cache.get(key)
+    if mask is None:
+        height = len(FONT_5X7["A"]) * scale
+        gap = np.zeros((height, scale), dtype=bool)
+        parts = []
+        for idx, ch in enumerate(chars):
+            parts.append(glyph_mask(ch, scale))
+            if idx < len(chars) - 1:
+                parts.append(gap)
+        flat = np.hstack(parts) if parts else np.zeros((height, 0), dtype=bool)
+        mask = np.zeros((height + 1, flat.shape[1] + 1), dtype=bool)
+        for dy in (0, 1):
+            for dx in (0, 1):
+                mask[dy : dy + height, dx : dx + flat.shape[1]] |= flat
+        if len(text_cache) >= TEXT_CACHE_LIMIT:
+            text_cache.clear()
+        text_cache[key] = mask
+    return mask
+
+
+def draw_text(message: str, pos: Tuple[int, int], colour: Tuple[int, int, int] = (220, 220, 220), scale: int = 4) -> None:
+    # Stamps the cached string mask into the Dorothy canvas in one write
+    mask = text_mask(message, scale)
+    canvas = dot.canvas
+    x0, y0 = int(pos[0]), int(pos[1])
+    x1 = min(x0 + mask.shape[1], canvas.shape[1])
+    y1 = min(y0 + mask.shape[0], canvas.shape[0])
+    cx, cy = max(x0, 0), max(y0, 0)
+    if cx >= x1 or cy >= y1:
+        return
+    region = canvas[cy:y1, cx:x1]
+    value = tuple(colour) + (255,) * (region.shape[2] - len(colour))
+    region[mask[cy - y0 : y1 - y0, cx - x0 : x1 - x0]] = value
 
 
 def measure_text(message: str, scale: int) -> Tuple[int, int]:
     # Calculates how much space a message will occupy before rendering
-    chars = message.upper()
-    width = 0
-    for idx, ch in enumerate(chars):
-        glyph = FONT_5X7.get(ch, FONT_5X7[" "])
-        glyph_width = len(glyph[0])
-        width += glyph_width * scale
-        if idx < len(chars) - 1:
-            width += scale
-    height = len(FONT_5X7["A"]) * scale
-    return width, height
+    mask = text_mask(message, scale)
+    return mask.shape[1] - 1, mask.shape[0] - 1
 
 
 def compute_layout() -> None:
@@ -273,11 +210,11 @@ def compute_layout() -> None:
 
 compute_layout()
 
-grid = [[False] * STEP_COUNT for _ in GRID_ROWS]
+# Velocity/probability per step; clicking a cell toggles it at the default velocity
+pattern = Pattern(len(GRID_ROWS), STEP_COUNT)
 
 # Sequencer runtime state
 current_step = 0            # Column that is currently playing/highlighted
-last_step_time = 0.0        # Timestamp of the previous step advance
 mouse_was_down = False      # Tracks click transitions so toggles fire once
 is_playing = True           # Transport flag
 
@@ -308,16 +245,14 @@ def draw_button(label: str, rect: Tuple[int, int, int, int], active: bool, hover
 
 def clear_pattern() -> None:
     # Resets every step in the grid
-    for row in grid:
-        row[:] = [False] * STEP_COUNT
+    pattern.clear()
 
 
 def set_bpm(value: float) -> None:
     # Quantises and applies an external BPM change
-    global bpm, step_millis, last_step_time
+    global bpm
     bpm = max(40, min(240, int(round(value / 5.0) * 5)))
-    step_millis = 60000.0 / bpm
-    last_step_time = read_millis()
+    step_clock.set_bpm(bpm, sampler.clock)
 
 
 def tap_tempo() -> None:
@@ -337,28 +272,22 @@ def tap_tempo() -> None:
 
 def handle_button(name: str) -> None:
     # Routes button presses to the appropriate action
-    global is_playing, last_step_time
+    global is_playing
     if name == "start":
-        last_step_time = read_millis()
         if not is_playing:
             is_playing = True
-            trigger_step(current_step)
+            step_clock.play(current_step, sampler.clock)
+        else:
+            step_clock.resync(sampler.clock)
     elif name == "stop":
         is_playing = False
+        step_clock.stop()
     elif name == "clear":
         clear_pattern()
     elif name == "tap":
         tap_tempo()
 
 
-def draw_buttons(mouse_x: float, mouse_y: float) -> None:
-    # Renders the whole row of buttons with per-button state
-    active_map = {"start": is_playing, "stop": not is_playing}
-    for key, label in BUTTON_ORDER:
-        rect = button_rects[key]
-        draw_button(label, rect, active_map.get(key, False), point_in_rect(mouse_x, mouse_y, rect))
-
-
 def highlight(colour: Tuple[int, int, int], lift: int = 38) -> Tuple[int, int, int]:
     # Lightens a colour for hover/active feedback
     return tuple(min(255, c + lift) for c in colour)
@@ -374,24 +303,22 @@ def read_mouse() -> Tuple[bool, float, float]:
 
 
 def locate_cell(mx: float, my: float) -> Tuple[int, int] | None:
-    # Converts a mouse position into a grid row/column index if possible
-    start_x = GRID_LEFT + LABEL_WIDTH + LABEL_GAP
-    for row in range(len(GRID_ROWS)):
-        row_y = GRID_TOP + row * (CELL_SIZE + CELL_GAP)
-        if not (row_y <= my <= row_y + CELL_SIZE):
-            continue
-        for col in range(STEP_COUNT):
-            cell_x = start_x + col * (CELL_SIZE + CELL_GAP)
-            if cell_x <= mx <= cell_x + CELL_SIZE:
-                return row, col
+    # Converts a mouse position into a grid row/column index if possible:
+    # divide by the cell pitch, then check the point isn't in the gap
+    pitch = CELL_SIZE + CELL_GAP
+    col, cell_dx = divmod(mx - (GRID_LEFT + LABEL_WIDTH + LABEL_GAP), pitch)
+    row, cell_dy = divmod(my - GRID_TOP, pitch)
+    if 0 <= row < pattern.tracks and 0 <= col < pattern.steps and cell_dx <= CELL_SIZE and cell_dy <= CELL_SIZE:
+        return int(row), int(col)
     return None
 
 
-def trigger_step(step_index: int) -> None:
-    # Fires any samples whose row is active for the current column
-    for row_index, row in enumerate(grid):
-        if row[step_index]:
-            sampler.trigger(row_index)
+def trigger_step(step_index: int, offset: int = 0) -> None:
+    # Fires any samples whose row is active for the column, `offset` frames
+    # into the audio block being rendered (called from the audio thread)
+    tracks, velocities = pattern.hits(step_index)
+    for track, velocity in zip(tracks.tolist(), velocities.tolist()):
+        sampler.start(track, velocity, offset)
 
 
 def read_millis() -> float:
@@ -408,74 +335,215 @@ def read_millis() -> float:
         return 0.0
 
 
-def draw_grid(active_col: int) -> None:
-    # Draws the main sequencer grid plus row labels
-    start_x = GRID_LEFT + LABEL_WIDTH + LABEL_GAP
+# Retained-mode drawing: everything that never changes is baked once into
+# static_layer; each frame only widgets whose state changed are repainted,
+# after restoring the static pixels under them. Grid cells aren't diffed:
+# the pattern reports its edits and the playhead names its columns, so a
+# frame's cost doesn't grow with the pattern.
+Rect = Tuple[int, int, int, int]
+BUTTON_LABELS = dict(BUTTON_ORDER)
+BPM_SCALE = 2
+static_layer: np.ndarray | None = None
+static_calls = 0
+drawn_canvas: np.ndarray | None = None
+drawn_widgets: Dict[tuple, Tuple[Rect, tuple]] = {}
+drawn_col = -1
+ui_stats = {"frames": 0, "calls": 0, "full_calls": 0, "last_saved": 0}
+
+
+def bake_static_layer() -> int:
+    # Draws the background, header, instructions and row labels, keeps a copy
+    # and returns the draw calls that took
+    global static_layer
+    dot.background(BACKGROUND)
+    draw_text(HEADER_TEXT, HEADER_POS, colour=LABEL_TEXT, scale=HEADER_SCALE)
+    draw_text(INSTRUCTION_TEXT, INSTRUCTION_POS, colour=(180, 180, 180), scale=INSTRUCTION_SCALE)
     label_height = LABEL_SCALE * len(FONT_5X7["A"])
     for row_index, name in enumerate(GRID_ROWS):
         row_y = GRID_TOP + row_index * (CELL_SIZE + CELL_GAP)
-
         dot.fill(LABEL_BG)
         dot.rectangle((GRID_LEFT, row_y), (GRID_LEFT + LABEL_WIDTH, row_y + CELL_SIZE))
         text_y = int(row_y + (CELL_SIZE - label_height) / 2)
         draw_text(name, (GRID_LEFT + 18, text_y), colour=LABEL_TEXT, scale=LABEL_SCALE)
+    static_layer = dot.canvas.copy()
+    return 3 + 2 * len(GRID_ROWS)
 
-        for col in range(STEP_COUNT):
-            cell_x = start_x + col * (CELL_SIZE + CELL_GAP)
-            colour = STEP_ON if grid[row_index][col] else STEP_OFF
-            if col == active_col:
-                colour = highlight(colour, 54 if grid[row_index][col] else 36)
-            dot.fill(colour)
-            dot.rectangle((cell_x, row_y), (cell_x + CELL_SIZE, row_y + CELL_SIZE))
+
+def collect_widgets(mouse_x: float, mouse_y: float) -> Dict[tuple, Tuple[Rect, tuple]]:
+    # The buttons and BPM readout with their (inclusive) rects and the state they are drawn from
+    widgets: Dict[tuple, Tuple[Rect, tuple]] = {}
+    active_map = {"start": is_playing, "stop": not is_playing}
+    for key, _ in BUTTON_ORDER:
+        rect = button_rects[key]
+        widgets[("button", key)] = (rect, (active_map.get(key, False), point_in_rect(mouse_x, mouse_y, rect)))
+
+    text = f"BPM {bpm}"
+    text_width, text_height = measure_text(text, BPM_SCALE)
+    bpm_y = GRID_TOP + GRID_HEIGHT + 24
+    widgets[("bpm",)] = ((GRID_LEFT, bpm_y, GRID_LEFT + text_width, bpm_y + text_height), (text,))
+    return widgets
+
+
+def paint_widget(key: tuple, rect: Rect, state: tuple) -> int:
+    # Draws one widget from its state and returns the draw calls used
+    kind = key[0]
+    if kind == "button":
+        active, hover = state
+        draw_button(BUTTON_LABELS[key[1]], rect, active, hover)
+        return 2
+    draw_text(state[0], rect[:2], colour=(180, 180, 180), scale=BPM_SCALE)
+    return 1
+
+
+def cell_rect(row: int, col: int) -> Rect:
+    x = GRID_LEFT + LABEL_WIDTH + LABEL_GAP + col * (CELL_SIZE + CELL_GAP)
+    y = GRID_TOP + row * (CELL_SIZE + CELL_GAP)
+    return (x, y, x + CELL_SIZE, y + CELL_SIZE)
+
+
+def paint_cell(row: int, col: int, active_col: int) -> None:
+    # Cells are opaque over their whole rect, so nothing needs restoring first
+    on = pattern.is_on(row, col)
+    colour = STEP_ON if on else STEP_OFF
+    if col == active_col:
+        colour = highlight(colour, 54 if on else 36)
+    dot.fill(colour)
+    x1, y1, x2, y2 = cell_rect(row, col)
+    dot.rectangle((x1, y1), (x2, y2))
+
+
+def cells_under(area: Rect) -> List[Tuple[int, int]]:
+    # Grid cells overlapping an area, by arithmetic on the cell pitch
+    pitch = CELL_SIZE + CELL_GAP
+    left = GRID_LEFT + LABEL_WIDTH + LABEL_GAP
+    col0 = max(0, -(-(area[0] - left - CELL_SIZE) // pitch))
+    col1 = min(pattern.steps - 1, (area[2] - left) // pitch)
+    row0 = max(0, -(-(area[1] - GRID_TOP - CELL_SIZE) // pitch))
+    row1 = min(pattern.tracks - 1, (area[3] - GRID_TOP) // pitch)
+    return [(row, col) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)]
+
+
+def rects_overlap(a: Rect, b: Rect) -> bool:
+    # Inclusive rectangle intersection test
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def invalidate_ui() -> None:
+    # Forces the next frame to repaint everything
+    global drawn_canvas
+    drawn_canvas = None
+    drawn_widgets.clear()
+
+
+def redraw_ui(mouse_x: float, mouse_y: float, active_col: int, extra_dirty: List[Rect]) -> None:
+    # Repaints what changed since the last frame; extra_dirty are areas drawn
+    # over by someone else (e.g. the profiler overlay) that must be restored
+    global drawn_canvas, drawn_widgets, drawn_col, static_calls
+    widgets = collect_widgets(mouse_x, mouse_y)
+    edits = pattern.take_edits()
+    canvas = dot.canvas
+    calls = 0
+    if drawn_canvas is not canvas:
+        # first frame, or Dorothy handed us a new canvas
+        if static_layer is None or static_layer.shape != canvas.shape:
+            static_calls = bake_static_layer()
+        else:
+            canvas[...] = static_layer
+        calls = static_calls
+        for key, (rect, state) in widgets.items():
+            calls += paint_widget(key, rect, state)
+        for row in range(pattern.tracks):
+            for col in range(pattern.steps):
+                paint_cell(row, col, active_col)
+        calls += pattern.tracks * pattern.steps
+        ui_stats["full_calls"] = calls
+    else:
+        dirty = list(extra_dirty)
+        for key, (rect, state) in widgets.items():
+            prev = drawn_widgets.get(key)
+            if prev != (rect, state):
+                dirty.append(rect)
+                if prev is not None and prev[0] != rect:
+                    dirty.append(prev[0])
+        for x1, y1, x2, y2 in dirty:
+            canvas[y1 : y2 + 1, x1 : x2 + 1] = static_layer[y1 : y2 + 1, x1 : x2 + 1]
+        calls = len(dirty)
+        if dirty:
+            for key, (rect, state) in widgets.items():
+                if any(rects_overlap(rect, area) for area in dirty):
+                    calls += paint_widget(key, rect, state)
+
+        cells = set(edits)
+        if active_col != drawn_col:
+            for row in range(pattern.tracks):
+                cells.add((row, active_col))
+                if 0 <= drawn_col < pattern.steps:
+                    cells.add((row, drawn_col))
+        for area in dirty:
+            cells.update(cells_under(area))
+        for row, col in cells:
+            paint_cell(row, col, active_col)
+        calls += len(cells)
+    drawn_widgets = widgets
+    drawn_col = active_col
+    drawn_canvas = canvas
+
+    ui_stats["frames"] += 1
+    ui_stats["calls"] += calls
+    ui_stats["last_saved"] = ui_stats["full_calls"] - calls
+
+
+def report_ui() -> None:
+    # Average draw calls per frame against repainting everything
+    frames = ui_stats["frames"]
+    if frames:
+        avg = ui_stats["calls"] / frames
+        full = ui_stats["full_calls"]
+        print(f"[UI] {frames} frames, {avg:.1f} of {full} draw calls per frame ({full - avg:.1f} saved)")
+
+
+atexit.register(report_ui)
 
 
 def setup() -> None:
     # Initialisation for Dorothy's draw loop
-    global last_step_time
-    dot.background(BACKGROUND)
-    last_step_time = read_millis()
+    invalidate_ui()
     if is_playing:
-        trigger_step(current_step)
+        step_clock.play(current_step, sampler.clock)
 
 
 def draw() -> None:
     # Main frame loop
-    global current_step, last_step_time, mouse_was_down
-    now = read_millis()
-    if is_playing:
-        while now - last_step_time >= step_millis:
-            # Step in fixed increments so downbeat timing stays stable
-            last_step_time += step_millis
-            current_step = (current_step + 1) % STEP_COUNT
-            trigger_step(current_step)
-    else:
-        last_step_time = now
-
-    mouse_down, mx, my = read_mouse()
-    if mouse_down and not mouse_was_down:
-        # Buttons get priority; fall back to toggling grid cells
-        for key, _ in BUTTON_ORDER:
-            if point_in_rect(mx, my, button_rects[key]):
-                handle_button(key)
-                break
-        else:
-            hit = locate_cell(mx, my)
-            if hit:
-                r, c = hit
-                grid[r][c] = not grid[r][c]
-    mouse_was_down = mouse_down
-
-    dot.background(BACKGROUND)
-    draw_text(HEADER_TEXT, HEADER_POS, colour=LABEL_TEXT, scale=HEADER_SCALE)
-    draw_buttons(mx, my)
-    draw_text(INSTRUCTION_TEXT, INSTRUCTION_POS, colour=(180, 180, 180), scale=INSTRUCTION_SCALE)
-    draw_grid(current_step)
-    bpm_y = GRID_TOP + GRID_HEIGHT + 24
-    draw_text(f"BPM {bpm}", (GRID_LEFT, bpm_y), colour=(180, 180, 180), scale=2)
-
+    global current_step, mouse_was_down
+    with profiler.stage("clock"):
+        # The audio thread advances the steps; the UI just follows it
+        current_step = step_clock.current
+
+    with profiler.stage("input"):
+        mouse_down, mx, my = read_mouse()
+        if mouse_down and not mouse_was_down:
+            # Buttons get priority; fall back to toggling grid cells
+            for key, _ in BUTTON_ORDER:
+                if point_in_rect(mx, my, button_rects[key]):
+                    handle_button(key)
+                    break
+            else:
+                hit = locate_cell(mx, my)
+                if hit:
+                    r, c = hit
+                    if not pattern.is_on(r, c):
+                        # load the drum before the hit is published, so the
+                        # audio thread never has to
+                        sampler.prepare(r)
+                    pattern.toggle(r, c)
+        mouse_was_down = mouse_down
+
+    with profiler.stage("ui draw"):
+        overlay = [profiler.overlay_area] if profiler.overlay_area else []
+        redraw_ui(mx, my, current_step, overlay)
 
 if __name__ == "__main__":
     try:
-        dot.start_loop(setup, draw)
+        dot.start_loop(*profiler.wrap(dot, setup, draw))
     except KeyboardInterrupt:
         pass
@@ -0,0 +1,92 @@
+"""Step pattern store for Sequence Store.
+
+velocity[track, step] (0 = off) and probability[track, step] live in NumPy
+arrays. For every step the tracks that are on are kept ready as small
+arrays, rebuilt only when that step is edited, so firing a step costs
+O(hits on it) and an edit costs O(tracks), whatever the pattern size.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_VELOCITY = 0.85
+
+
+class Pattern:
+    # tracks x steps pattern; track t plays sample t of the kit
+    def __init__(self, tracks: int, steps: int, seed: int | None = None):
+        self.velocity = np.zeros((tracks, steps), dtype=np.float32)
+        self.probability = np.ones((tracks, steps), dtype=np.float32)
+        self.rng = np.random.default_rng(seed)
+
+        # per step: (tracks on, their velocities, their probabilities or None
+        # when all are 1). Replaced whole on edit, so the audio thread always
+        # reads a consistent column.
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), None)
+        self.columns = [empty] * steps
+        self.edits: List[Tuple[int, int]] = []   # cells changed since take_edits()
+
+    @classmethod
+    def from_grid(cls, grid: Sequence[Sequence[bool]], velocity: float = DEFAULT_VELOCITY,
+                  seed: int | None = None) -> "Pattern":
+        # Rows of step flags (as in the original list-of-lists grid) -> Pattern
+        steps = max(len(row) for row in grid)
+        pattern = cls(len(grid), steps, seed)
+        for track, row in enumerate(grid):
+            pattern.velocity[track, : len(row)] = np.asarray(row, dtype=bool) * velocity
+        for step in range(steps):
+            pattern._refresh(step)
+        return pattern
+
+    @property
+    def tracks(self) -> int:
+        return self.velocity.shape[0]
+
+    @property
+    def steps(self) -> int:
+        return self.velocity.shape[1]
+
+    def is_on(self, track: int, step: int) -> bool:
+        return bool(self.velocity[track, step] > 0)
+
+    def set(self, track: int, step: int, velocity: float, probability: float | None = None) -> None:
+        # velocity 0 turns the step off; probability is the chance it fires
+        self.velocity[track, step] = max(0.0, min(1.0, float(velocity)))
+        if probability is not None:
+            self.probability[track, step] = max(0.0, min(1.0, float(probability)))
+        self._refresh(step)
+        self.edits.append((track, step))
+
+    def toggle(self, track: int, step: int, velocity: float = DEFAULT_VELOCITY) -> bool:
+        # Flips a step on (at `velocity`) or off; returns the new state
+        on = not self.is_on(track, step)
+        self.set(track, step, velocity if on else 0.0)
+        return on
+
+    def clear(self) -> None:
+        for step, (tracks, _, _) in enumerate(self.columns):
+            self.edits.extend((int(track), step) for track in tracks)
+        self.velocity[:] = 0.0
+        self.probability[:] = 1.0
+        for step in range(self.steps):
+            self._refresh(step)
+
+    def _refresh(self, step: int) -> None:
+        column = self.velocity[:, step]
+        tracks = np.flatnonzero(column)
+        probability = self.probability[tracks, step]
+        self.columns[step] = (tracks, column[tracks], probability if (probability < 1.0).any() else None)
+
+    def hits(self, step: int) -> Tuple[np.ndarray, np.ndarray]:
+        # (tracks, velocities) that play this pass through `step`, after the
+        # probability roll (skipped when every step in the column is certain)
+        tracks, velocities, probability = self.columns[step]
+        if probability is None:
+            return tracks, velocities
+        keep = self.rng.random(probability.size) < probability
+        return tracks[keep], velocities[keep]
+
+    def take_edits(self) -> List[Tuple[int, int]]:
+        # Cells changed since the last call, for the UI's redraw
+        edits, self.edits = self.edits, []
+        return edits
@@ -0,0 +1,440 @@
+"""Drum sampler, step clock and procedural kit behind Sequence Store.
+
+Nothing here needs Dorothy: Code.py hands SimpleSampler its Dorothy
+instance to play through the audio device, while Bounce.py leaves it out
+and pulls blocks itself to render patterns offline.
+"""
+import hashlib
+import json
+import os
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+
+from pattern import Pattern
+
+# Audio engine and sample preparation
+class SimpleSampler:
+    def __init__(self, dot=None, sample_rate: int = 22050, buffer_size: int = 128,
+                 max_voices: int = 16, stealing: str = "oldest", samples=None, lazy: bool = False):
+        if stealing not in ("oldest", "quietest"):
+            raise ValueError(f"unknown voice stealing policy {stealing!r}")
+        self.stealing = stealing
+
+        # All samples live back to back in one bank with a zero guard frame
+        # before and after each; voices read the guards before they start
+        # and after they finish
+        self.bank = np.zeros(1, dtype=np.float32)
+        self.starts = np.zeros(0, dtype=np.int64)   # bank index of each sample's first frame
+        self.loaded = np.zeros(0, dtype=np.bool_)   # sample copied into the bank yet (lazy kits)
+        self.source = None
+        self.ends = np.zeros(0, dtype=np.int64)     # bank index of the guard after it
+
+        # Fixed voice pool, one slot per array entry so the mixer can treat
+        # every voice at once; each hit gets its own voice
+        self.voice_sample = np.full(max_voices, -1, dtype=np.int64)  # sample playing, -1 = free
+        self.voice_start = np.zeros(max_voices, dtype=np.int64)      # guard index before that sample
+        self.voice_end = np.zeros(max_voices, dtype=np.int64)        # guard index after it
+        self.voice_born = np.zeros(max_voices, dtype=np.int64)       # trigger order, for "oldest"
+        self.voice_level = np.zeros(max_voices, dtype=np.float32)    # scratch for "quietest"
+        self.gains = np.zeros(max_voices, dtype=np.float32)
+        self.active = np.zeros(max_voices, dtype=np.bool_)
+        self.hits = 0
+        self.block_hits = 0
+        self.stolen = 0
+
+        # Hits arrive from the UI thread and are started on the audio thread
+        self.pending = deque()
+
+        # Audio clock: frames rendered so far. on_block(sampler, block_start, size)
+        # runs at the top of every block and may start() voices inside it.
+        self.clock = 0
+        self.on_block = None
+
+        self.index = None
+        self._alloc(buffer_size)
+        if samples is not None:
+            self.set_samples(samples, lazy)
+
+        # With a Dorothy instance, play live; without one the caller pulls
+        # blocks from get_frame itself (offline rendering). The stream starts
+        # last, once the bank and buffers are in place, so the first callback
+        # never sees them half built.
+        if dot is not None:
+            dot.music.start_dsp_stream(self.get_frame, sr=sample_rate, buffer_size=buffer_size, analyse=True)
+
+    def _alloc(self, size: int, heads=None) -> None:
+        # Per-block buffers, reused by every callback. index[v] holds the bank
+        # positions voice v reads this block, so it doubles as the playhead;
+        # start_grid / end_grid repeat each voice's guard indices across the block.
+        if heads is None:
+            heads = self.voice_end if self.index is None else self.index[:, 0]
+        self.ramp = np.arange(size, dtype=np.int64)
+        self.index = heads[:, None] + self.ramp
+        self.read = np.zeros_like(self.index)
+        self.start_grid = np.repeat(self.voice_start[:, None], size, axis=1)
+        self.end_grid = np.repeat(self.voice_end[:, None], size, axis=1)
+        self.frames = np.zeros((len(self.gains), size), dtype=np.float32)
+        self.audio = np.zeros(size, dtype=np.float32)
+        self.done = np.zeros(len(self.gains), dtype=np.bool_)
+
+    def _pick_voice(self) -> int:
+        # First free voice, otherwise steal one by the configured policy
+        free = int(np.argmin(self.active))
+        if not self.active[free]:
+            return free
+        self.stolen += 1
+        if self.stealing == "oldest":
+            return int(np.argmin(self.voice_born))
+        # loudness = gain x peak of what the voice played last block;
+        # voices started this block haven't played yet, so count them at full gain
+        np.abs(self.frames, out=self.frames)
+        np.max(self.frames, axis=1, out=self.voice_level)
+        self.voice_level *= self.gains
+        np.greater_equal(self.voice_born, self.block_hits, out=self.done)
+        np.copyto(self.voice_level, self.gains, where=self.done)
+        return int(np.argmin(self.voice_level))
+
+    def start(self, sample: int, gain: float, offset: int = 0) -> None:
+        # Start a voice `offset` frames into the block being rendered. Audio
+        # thread only: call it from on_block (the UI uses trigger()).
+        if not self.loaded[sample]:
+            self.prepare(sample)
+        v = self._pick_voice()
+        first = self.starts[sample]
+        np.add(self.ramp, first - offset, out=self.index[v])
+        self.start_grid[v].fill(first - 1)
+        self.end_grid[v].fill(self.ends[sample])
+        self.voice_start[v] = first - 1
+        self.voice_end[v] = self.ends[sample]
+        self.voice_sample[v] = sample
+        self.voice_born[v] = self.hits
+        self.gains[v] = gain
+        self.active[v] = True
+        self.hits += 1
+
+    def get_frame(self, size: int) -> np.ndarray:
+        # Mixes every voice into the outgoing buffer with a few whole-array ops.
+        # No operand broadcasts, so nothing is allocated per block, and the
+        # cost depends on the pool size, not on how many steps are lit.
+        if size != self.audio.size:
+            self._alloc(size)
+        self.block_hits = self.hits
+        while self.pending:
+            self.start(*self.pending.popleft())
+        if self.on_block is not None:
+            self.on_block(self, self.clock, size)
+
+        # Finished voices park on their trailing guard (safe in place: those
+        # frames stay past the end); frames before a mid-block start read the
+        # leading guard, clamped into a copy so the playhead stays linear
+        np.minimum(self.index, self.end_grid, out=self.index)
+        np.maximum(self.index, self.start_grid, out=self.read)
+        np.take(self.bank, self.read, out=self.frames, mode="clip")
+
+        # Weighted sum of all voices in one matrix-vector product
+        np.dot(self.gains, self.frames, out=self.audio)
+
+        # Voices whose last frame this block was the guard are free again
+        np.greater_equal(self.index[:, -1], self.voice_end, out=self.done)
+        np.copyto(self.gains, 0.0, where=self.done)
+        np.copyto(self.active, False, where=self.done)
+        self.index += size
+        self.clock += size
+        return np.clip(self.audio, -1.0, 1.0, out=self.audio)
+
+    def set_samples(self, sample_list, lazy: bool = False) -> None:
+        # sample_list is a list of arrays or a DrumKit. lazy=True (kit only)
+        # lays the bank out from the kit's lengths and copies each sample in
+        # on its first prepare() / start() instead of now. Not safe against a
+        # running stream: when playing live, pass samples to the constructor.
+        if lazy:
+            if not hasattr(sample_list, "lengths"):
+                raise ValueError("lazy loading needs a DrumKit (sample lengths known up front)")
+            sizes = list(sample_list.lengths)
+        else:
+            sample_list = [np.asarray(sample_list[i], dtype=np.float32).ravel() for i in range(len(sample_list))]
+            sizes = [len(sample) for sample in sample_list]
+        lengths = np.array([size + 1 for size in sizes], dtype=np.int64)
+        offsets = np.concatenate(([1], 1 + np.cumsum(lengths)[:-1])).astype(np.int64)
+        self.bank = np.zeros(int(lengths.sum()) + 1, dtype=np.float32)
+        self.starts = offsets
+        self.ends = offsets + lengths - 1
+        self.source = sample_list
+        self.loaded = np.zeros(len(sizes), dtype=np.bool_)
+        if not lazy:
+            for index in range(len(sizes)):
+                self.prepare(index)
+
+        # Park every voice on the final guard frame
+        self.voice_start[:] = len(self.bank) - 1
+        self.voice_end[:] = len(self.bank) - 1
+        self.voice_sample[:] = -1
+        self.gains[:] = 0.0
+        self.active[:] = False
+        self._alloc(self.audio.size, heads=self.voice_end)
+
+    def prepare(self, index: int) -> None:
+        # Copy one sample into its slot in the bank if it isn't there yet.
+        # Safe from either thread: a racing copy writes the same data.
+        if not self.loaded[index]:
+            first = self.starts[index]
+            self.bank[first : self.ends[index]] = self.source[index]
+            self.loaded[index] = True
+
+    def trigger(self, index: int, velocity: float = 0.85) -> None:
+        # Queue a hit; the audio thread gives it a voice at the next block
+        if 0 <= index < len(self.starts):
+            self.pending.append((index, max(0.0, min(1.0, float(velocity)))))
+
+    def stats(self) -> Dict[str, int]:
+        return {"voices": len(self.gains), "playing": int(self.active.sum()), "hits": self.hits, "stolen": self.stolen}
+
+
+class StepClock:
+    # Runs the sequencer on the audio clock. The sampler calls it at the top of
+    # every block; each step due inside the block fires at its exact frame, so
+    # timing no longer depends on the draw loop or the buffer size.
+    def __init__(self, sample_rate: int, bpm: float, step_count: int, fire):
+        self.sample_rate = sample_rate
+        self.step_count = step_count
+        self.fire = fire               # fire(step, offset) starts that step's voices
+        self.step_frames = sample_rate * 60.0 / bpm
+        self.next_frame = 0.0          # audio frame the next step lands on
+        self.step = 0                  # step due at next_frame
+        self.current = 0               # step played most recently, for the UI
+        self.playing = False
+
+    def play(self, step: int, now: int) -> None:
+        # Start from `step` at audio frame `now` (the next block to render)
+        self.step = step
+        self.next_frame = float(now)
+        self.playing = True
+
+    def stop(self) -> None:
+        self.playing = False
+
+    def resync(self, now: int) -> None:
+        # Next step one full step after `now`, as after a tempo change
+        self.next_frame = now + self.step_frames
+
+    def set_bpm(self, bpm: float, now: int) -> None:
+        self.step_frames = self.sample_rate * 60.0 / bpm
+        self.resync(now)
+
+    def __call__(self, sampler: "SimpleSampler", block_start: int, size: int) -> None:
+        if not self.playing:
+            return
+        block_end = block_start + size
+        while self.next_frame < block_end:
+            self.fire(self.step, max(0, int(self.next_frame) - block_start))
+            self.current = self.step
+            self.step = (self.step + 1) % self.step_count
+            self.next_frame += self.step_frames
+
+
+# Drum kit: one generator per voice, driven by KIT_PARAMS (seconds, envelope
+# decay, normalised peak and a few tone settings). Bump KIT_VERSION whenever a
+# generator's code changes so cached samples are rebuilt.
+KIT_VERSION = 1
+KIT_SEED = 404
+KIT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".kitcache")
+KIT_PARAMS: Dict[str, Dict[str, float]] = {
+    "KICK":    {"length": 0.45, "decay": 6.2,  "peak": 0.86, "pitch": 42.0, "sweep": 90.0},
+    "SNARE":   {"length": 0.38, "decay": 12.5, "peak": 0.78, "pitch": 190.0},
+    "HIHAT":   {"length": 0.18, "decay": 28.0, "peak": 0.72},
+    "CLAP":    {"length": 0.32, "decay": 16.0, "peak": 0.75, "spacing": 0.012},
+    "TOM":     {"length": 0.46, "decay": 7.0,  "peak": 0.82, "pitch": 140.0},
+    "RIDE":    {"length": 0.8,  "decay": 3.4,  "peak": 0.7,  "smooth": 5},
+    "COWBELL": {"length": 0.36, "decay": 10.5, "peak": 0.8,  "pitch": 540.0},
+    "SHAKER":  {"length": 0.22, "decay": 22.0, "peak": 0.68},
+    "CRASH":   {"length": 1.2,  "decay": 1.8,  "peak": 0.72, "smooth": 12},
+}
+
+# Instrument names, in the order the kit returns them
+KIT_NAMES = tuple(KIT_PARAMS)
+
+
+def _exp_env(length: float, sr: int, decay: float) -> np.ndarray:
+    # Simple exponential decay envelope used across the drum kit sounds
+    steps = int(sr * length)
+    if steps <= 0:
+        return np.zeros(1, dtype=np.float32)
+    t = np.linspace(0.0, length, steps, endpoint=False)
+    return np.exp(-decay * t)
+
+
+def _normalize(sample: np.ndarray, peak: float = 0.8) -> np.ndarray:
+    # Keeps samples within a predictable level so they mix cleanly
+    sample = np.array(sample, dtype=np.float32)
+    max_val = float(np.max(np.abs(sample))) if sample.size else 0.0
+    if max_val > 0:
+        sample = sample * (peak / max_val)
+    return sample
+
+
+def _kick(sr, rng, env, t, p):
+    sweep = p["sweep"] * np.exp(-6.0 * t) + p["pitch"]
+    tone = np.sin(2 * np.pi * np.cumsum(sweep) / sr)
+    click = np.exp(-220 * t) * (rng.random(env.size) * 0.2)
+    return tone * env + click
+
+
+def _snare(sr, rng, env, t, p):
+    return rng.normal(0.0, 1.0, env.size) * env * 0.8 + np.sin(2 * np.pi * p["pitch"] * t) * np.exp(-18 * t) * 0.4
+
+
+def _hihat(sr, rng, env, t, p):
+    return np.sign(rng.normal(0.0, 1.0, env.size)) * env * 0.6
+
+
+def _clap(sr, rng, env, t, p):
+    noise = rng.normal(0.0, 1.0, env.size)
+    pulse = np.zeros_like(noise)
+    for offset in (0, int(p["spacing"] * sr), int(2 * p["spacing"] * sr)):
+        end = min(env.size, offset + int(0.02 * sr))
+        pulse[offset:end] += env[0 : end - offset]
+    return noise * env * 0.45 + pulse * 0.5
+
+
+def _tom(sr, rng, env, t, p):
+    return np.sin(2 * np.pi * p["pitch"] * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 2.2 * t)) * env
+
+
+def _ride(sr, rng, env, t, p):
+    base = rng.normal(0.0, 1.0, env.size)
+    return np.convolve(base, np.ones(p["smooth"]) / p["smooth"], mode="same") * env * 0.55
+
+
+def _cowbell(sr, rng, env, t, p):
+    return (np.sin(2 * np.pi * p["pitch"] * t) + 0.6 * np.sin(2 * np.pi * 1.5 * p["pitch"] * t)) * env
+
+
+def _shaker(sr, rng, env, t, p):
+    noise = rng.normal(0.0, 1.0, env.size)
+    return noise * env * (0.5 + 0.5 * np.sin(2 * np.pi * 16 * np.arange(env.size) / env.size))
+
+
+def _crash(sr, rng, env, t, p):
+    noise = rng.normal(0.0, 1.0, env.size)
+    return np.convolve(noise, np.ones(p["smooth"]) / p["smooth"], mode="same") * env * 0.6
+
+
+KIT_SYNTHS = {
+    "KICK": _kick, "SNARE": _snare, "HIHAT": _hihat, "CLAP": _clap, "TOM": _tom,
+    "RIDE": _ride, "COWBELL": _cowbell, "SHAKER": _shaker, "CRASH": _crash,
+}
+
+
+class DrumKit:
+    # The procedural kit, one voice at a time. Each voice draws its noise from
+    # its own child of the KIT_SEED stream, so it comes out the same whether
+    # it is built alone or with the rest. Built voices are saved to cache_dir
+    # as .npy, keyed on sample rate + parameters, and later runs memory-map
+    # them instead of synthesising. Indexing a voice builds or loads it;
+    # `lengths` is known up front, which is what lazy loading in the sampler uses.
+    def __init__(self, sample_rate: int, params: Dict[str, Dict[str, float]] = KIT_PARAMS,
+                 cache_dir: str | None = KIT_CACHE_DIR, seed: int = KIT_SEED):
+        self.sample_rate = sample_rate
+        self.params = params
+        self.names = tuple(params)
+        self.cache_dir = cache_dir
+        self.seed = seed
+        self.seeds = np.random.SeedSequence(seed).spawn(len(params))
+        self.lengths = [max(1, int(sample_rate * p["length"])) for p in params.values()]
+        self.samples: List[np.ndarray | None] = [None] * len(params)
+        self.built = 0    # voices synthesised (cache misses)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def cache_path(self, index: int) -> str:
+        name = self.names[index]
+        key = json.dumps([KIT_VERSION, self.seed, index, self.sample_rate, name, self.params[name]], sort_keys=True)
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{name.lower()}_{self.sample_rate}_{digest}.npy")
+
+    def synthesise(self, index: int) -> np.ndarray:
+        name = self.names[index]
+        p = self.params[name]
+        rng = np.random.default_rng(self.seeds[index])
+        env = _exp_env(p["length"], self.sample_rate, p["decay"])
+        t = np.arange(env.size) / self.sample_rate
+        return _normalize(KIT_SYNTHS[name](self.sample_rate, rng, env, t, p), p["peak"])
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        if not 0 <= index < len(self.names):
+            raise IndexError(index)
+        sample = self.samples[index]
+        if sample is not None:
+            return sample
+
+        path = self.cache_path(index) if self.cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                sample = np.load(path, mmap_mode="r")
+            except (OSError, ValueError):
+                sample = None
+        if sample is None:
+            sample = self.synthesise(index)
+            self.built += 1
+            if path:
+                # write beside the final name, then swap in, so readers never see half a file
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp = f"{path[:-4]}.{os.getpid()}.tmp.npy"
+                    np.save(tmp, sample)
+                    os.replace(tmp, path)
+                except OSError as e:
+                    print("[KIT] cache unavailable, keeping samples in memory:", e)
+                    self.cache_dir = None
+        self.samples[index] = sample
+        return sample
+
+
+def build_sample_pack(sr: int, cache_dir: str | None = KIT_CACHE_DIR) -> List[np.ndarray]:
+    # Procedurally builds a small drum kit so the sequencer can run standalone
+    kit = DrumKit(sr, cache_dir=cache_dir)
+    return [kit[i] for i in range(len(kit))]
+
+
+def render_pattern(pattern, bpm: float, bars: int = 1, sample_rate: int = 22050,
+                   block_size: int = 1024, gain: float = 0.85, tail: bool = True,
+                   samples: List[np.ndarray] | None = None, max_voices: int = 16,
+                   stealing: str = "oldest") -> np.ndarray:
+    # Plays a Pattern (or rows of step flags, played at `gain`) for `bars`
+    # passes through the same sampler + step clock the live sketch uses,
+    # pulling blocks as fast as they mix. tail=True lets the last hits ring
+    # out; tail=False returns exactly bars loops, for seamless looping.
+    if not isinstance(pattern, Pattern):
+        pattern = Pattern.from_grid(pattern, gain)
+    sampler = SimpleSampler(None, sample_rate, block_size, max_voices, stealing,
+                            samples=samples if samples is not None else build_sample_pack(sample_rate))
+    if pattern.tracks > len(sampler.starts):
+        raise ValueError(f"pattern has {pattern.tracks} tracks but only {len(sampler.starts)} samples")
+    total_steps = bars * pattern.steps
+    fired = 0
+
+    def fire(step: int, offset: int) -> None:
+        nonlocal fired
+        if fired >= total_steps:
+            return
+        fired += 1
+        tracks, velocities = pattern.hits(step)
+        for track, velocity in zip(tracks.tolist(), velocities.tolist()):
+            sampler.start(track, velocity, offset)
+
+    clock = StepClock(sample_rate, bpm, pattern.steps, fire)
+    clock.play(0, 0)
+    sampler.on_block = clock
+
+    length = int(np.ceil(total_steps * clock.step_frames))
+    if tail:
+        last_hit = int((total_steps - 1) * clock.step_frames)
+        length = max(length, last_hit + int(np.max(sampler.ends - sampler.starts)) + 1)
+    blocks = -(-length // block_size)
+    out = np.zeros(blocks * block_size, dtype=np.float32)
+    for pos in range(0, out.size, block_size):
+        out[pos : pos + block_size] = sampler.get_frame(block_size)
+    return out[:length]
@@ -3,6 +3,10 @@ import numpy as np
 import sounddevice as sd
 import math
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sketch_profiler import FrameProfiler
 
 FALLBACK_DIR = "/Users/stonesavage/Desktop/Coding for media/data/MP3s"
 
@@ -74,6 +78,10 @@ LINE_THRESH = 0.001
 
 TRAIL_ALPHA = 30
 
+# Frame timing: per-stage histograms, dumped to shape_of_music_timing.csv/.json on exit
+PROFILE = False
+PROFILE_OVERLAY = True
+
 # Frequency bands 
 BANDS = [
     (0.0, 1.00),
@@ -93,6 +101,7 @@ STYLES = [
 ]
 
 dot = Dorothy(1600, 900)
+profiler = FrameProfiler("shape_of_music", PROFILE, PROFILE_OVERLAY)
 
 global_env = 0.0
 prev_env = 0.0
@@ -179,25 +188,28 @@ def setup():
 def draw():
     global global_env, prev_env, beat_env
 
-    # Real-time FFT magnitudes and amplitude
-    fft = dot.music.fft()
-    amp = dot.music.amplitude()
+    with profiler.stage("fft mapping"):
+        # Real-time FFT magnitudes and amplitude
+        fft = dot.music.fft()
+        amp = dot.music.amplitude()
 
-    # Smooth amplitude envelope
-    global_env = attack_release(global_env, amp, ENV_ATTACK, ENV_RELEASE)
-    global_env = ENV_SMOOTH * global_env + (1 - ENV_SMOOTH) * amp
-    loud = min(1.0, max(0.0, global_env * 3.0))
+        # Smooth amplitude envelope
+        global_env = attack_release(global_env, amp, ENV_ATTACK, ENV_RELEASE)
+        global_env = ENV_SMOOTH * global_env + (1 - ENV_SMOOTH) * amp
+        loud = min(1.0, max(0.0, global_env * 3.0))
 
-    # Beat estimation using slope of envelope
-    slope = max(0.0, global_env - prev_env)
-    prev_env = global_env
-    beat_imp = min(1.0, slope * 20.0)
-    beat_env = beat_env * 0.85 + beat_imp
+        # Beat estimation using slope of envelope
+        slope = max(0.0, global_env - prev_env)
+        prev_env = global_env
+        beat_imp = min(1.0, slope * 20.0)
+        beat_env = beat_env * 0.85 + beat_imp
 
-    # Draw a transparent black rectangle over the entire canvas every frame
-    dot.fill((0, 0, 0, TRAIL_ALPHA))
-    dot.rectangle((0, 0), (dot.width, dot.height))
+    with profiler.stage("trails"):
+        # Draw a transparent black rectangle over the entire canvas every frame
+        dot.fill((0, 0, 0, TRAIL_ALPHA))
+        dot.rectangle((0, 0), (dot.width, dot.height))
 
-    draw_layers(loud, fft, beat_env)
+    with profiler.stage("polygons"):
+        draw_layers(loud, fft, beat_env)
 
-dot.start_loop(setup, draw)
+dot.start_loop(*profiler.wrap(dot, setup, draw))
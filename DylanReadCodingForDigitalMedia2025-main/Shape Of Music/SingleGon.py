@@ -1,8 +1,12 @@
 from dorothy import Dorothy
 import numpy as np
 import os
+import sys
 import math
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sketch_profiler import FrameProfiler
+
 AUDIO_FOLDER = "/Users/stonesavage/Desktop/Coding for media/data/MP3s"
 
 # Pick 1st file and works for muptipule file types
@@ -13,6 +17,11 @@ file_path = os.path.join(AUDIO_FOLDER, audio_files[0])
 
 dot = Dorothy(width=1600, height=900)
 
+# Frame timing: per-stage histograms, dumped to singlegon_timing.csv/.json on exit
+PROFILE = False
+PROFILE_OVERLAY = True
+profiler = FrameProfiler("singlegon", PROFILE, PROFILE_OVERLAY)
+
 env = 0.0          # smoothed amplitude envelope
 points = 3.0       # polygon vertex count
 angle = 0.0        # rotation accumulator
@@ -49,29 +58,32 @@ def setup():
 def draw():
     global env, points, angle
 
-    # Audio analysis 
-    fft = dot.music.fft()                # 512-bin magnitude spectrum
-    amp = dot.music.amplitude()          # amplitude of current frame
+    with profiler.stage("fft mapping"):
+        # Audio analysis 
+        fft = dot.music.fft()                # 512-bin magnitude spectrum
+        amp = dot.music.amplitude()          # amplitude of current frame
 
-    # Envelope smoothing
-    env = attack_release(env, amp)
-    env = 0.3 * env + 0.7 * amp          # extra inertia
+        # Envelope smoothing
+        env = attack_release(env, amp)
+        env = 0.3 * env + 0.7 * amp          # extra inertia
 
-    # Average spectral energy
-    energy = float(np.mean(fft)) if len(fft) else 0.0
+        # Average spectral energy
+        energy = float(np.mean(fft)) if len(fft) else 0.0
 
-    # Polygon complexity
-    target = 2 + int(energy * 10)        # map energy > number of sides
-    points += (target - points) * 0.2    # interpolation for smooth change
+        # Polygon complexity
+        target = 2 + int(energy * 10)        # map energy > number of sides
+        points += (target - points) * 0.2    # interpolation for smooth change
 
-    # Trails 
-    dot.fill((0, 0, 0, 25))
-    dot.rectangle((0, 0), (dot.width, dot.height))
+    with profiler.stage("trails"):
+        # Trails 
+        dot.fill((0, 0, 0, 25))
+        dot.rectangle((0, 0), (dot.width, dot.height))
 
     # Rotation 
     angle += 0.01
 
-    # Draw polygon 
-    draw_polygon(int(points), angle)
+    with profiler.stage("polygon"):
+        # Draw polygon 
+        draw_polygon(int(points), angle)
 
-dot.start_loop(setup, draw)
+dot.start_loop(*profiler.wrap(dot, setup, draw))
@@ -0,0 +1,79 @@
+import sys, time
+import numpy as np
+
+from mosaic import build_index, load_tile_library
+
+
+# Library sizes to try (synthetic LAB means, or a slice of a real dataset)
+LIBRARY_SIZES = [1_000, 10_000, 50_000]
+DATASET_DIR   = None            # set to a folder to benchmark real tile LABs
+TILE_W, TILE_H = 64, 64
+
+# Query shape: one full mosaic grid
+GRID_W, GRID_H = 128, 64
+TOPK = 10
+FRAMES = 6                      # frames timed cold, then again warm
+KINDS = ("brute", "exact", "approx")
+
+np.random.seed(36)
+
+
+def fake_labs(n):
+    """LAB means clustered like real photos: wide L, a/b near neutral."""
+    labs = np.random.normal((128, 128, 128), (50, 12, 14), (n, 3))
+    return np.clip(labs, 0, 255).astype(np.float32)
+
+
+def run(tile_labs, queries):
+    """Time every index kind on the same queries and compare with brute force.
+
+    cold is a first pass over the frames, building voxels as they are first
+    hit; warm is a second pass over the same frames, once they are built.
+    """
+    ref = None
+    for kind in KINDS:
+        t = time.perf_counter()
+        index = build_index(tile_labs, TOPK, kind)
+        build = time.perf_counter() - t
+
+        t = time.perf_counter()
+        first = [index.query(q) for q in queries][0]
+        cold = (time.perf_counter() - t) / len(queries)
+
+        t = time.perf_counter()
+        for q in queries:
+            index.query(q)
+        warm = (time.perf_counter() - t) / len(queries)
+
+        # compare by distance so exact ties in the library don't count as misses
+        d = np.sum((tile_labs[first] - queries[0][..., None, :]) ** 2, axis=-1)
+        if ref is None:
+            ref = d
+        err = np.sqrt(d[..., 0]) - np.sqrt(ref[..., 0])
+        same = np.allclose(d, ref)
+
+        print(f"  {kind:6s} build {build * 1000:7.1f} ms   cold {cold * 1000:8.1f} ms   warm {warm * 1000:8.1f} ms per frame"
+              f"   matches brute: {'yes' if same else 'no '}   mean dE of best +{err.mean():.2f}")
+
+
+def main():
+    pool = None
+    if DATASET_DIR:
+        _, pool = load_tile_library(DATASET_DIR, TILE_W, TILE_H)
+        pool = np.asarray(pool)
+
+    # video-like queries: a base frame plus small per-frame drift
+    base = fake_labs(GRID_W * GRID_H).reshape(GRID_H, GRID_W, 3)
+    queries = [np.clip(base + np.random.normal(0, 2, base.shape), 0, 255).astype(np.float32)
+               for _ in range(FRAMES)]
+
+    for n in LIBRARY_SIZES:
+        tile_labs = fake_labs(n) if pool is None else pool[:n]
+        print(f"[{len(tile_labs)} tiles, {GRID_W}x{GRID_H} grid, top-{TOPK}]")
+        run(tile_labs, queries)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        LIBRARY_SIZES = [int(a) for a in sys.argv[1:]]
+    main()
@@ -0,0 +1,47 @@
+import numpy as np
+
+from mosaic import MosaicRenderer, MotionColourStrategy, run_live
+
+CAMERA_INDEX  = 0
+RECORD_VIDEO  = None                # e.g. "mosaic_live.mp4" to keep a recording
+DATASET_DIR   = "/Users/stonesavage/Desktop/Coding for media/Code/images"
+
+# Mosaic grid resolution (in tiles)
+GRID_W, GRID_H = 128, 64
+
+# Tile size in pixels
+TILE_W, TILE_H = 64, 64
+
+# Output window resolution
+OUTPUT_W, OUTPUT_H = 1080, 720
+
+# Tile selection behaviour
+TOPK = 10                           # pick randomly from the closest-K tiles
+MATCH_INDEX = "approx"              # live: precomputed voxel table, cheapest per lookup
+MATCH_CACHE_BIN  = 2                # coarser bins -> more cache hits
+STABILITY_THRESHOLD = 18.0          # LAB threshold for colour corection updates
+TILE_COOLDOWN_FRAMES = 2            # prevents rapid flipping
+
+# Basic motion detector parameters
+BG_ALPHA         = 0.02             # background learning rate
+MOTION_THRESHOLD = 32               # threshold on |frame - background|
+
+# Real-time budget: mosaic ms per frame (None = one camera frame period).
+# Over budget, fewer cells re-match, then none, then the grid halves
+FRAME_BUDGET_MS = None
+GRID_LEVELS     = 2                 # full grid + one half-resolution fallback
+
+# reproducibility
+np.random.seed(36)
+
+
+# Live Mosaic
+
+def main():
+    strategy = MotionColourStrategy(BG_ALPHA, MOTION_THRESHOLD, STABILITY_THRESHOLD, TILE_COOLDOWN_FRAMES)
+    renderer = MosaicRenderer(strategy, DATASET_DIR, (GRID_W, GRID_H), (TILE_W, TILE_H), (OUTPUT_W, OUTPUT_H),
+                              TOPK, MATCH_INDEX, MATCH_CACHE_BIN)
+    run_live(renderer, CAMERA_INDEX, RECORD_VIDEO, FRAME_BUDGET_MS, GRID_LEVELS)
+
+if __name__ == "__main__":
+    main()
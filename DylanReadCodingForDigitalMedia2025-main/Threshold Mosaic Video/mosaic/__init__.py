@@ -0,0 +1,14 @@
+"""Shared engine for the Threshold Mosaic Video scripts.
+
+MosaicRenderer + a strategy object is one look; see __main__.py for the CLI.
+"""
+
+from .matching import topk_match_grid, pick_tiles, update_tiles
+from .render import MosaicCompositor
+from .library import list_images, load_tile, decode_tiles, build_tile_cache, open_tile_cache, load_tile_library
+from .index import BruteForceIndex, VoxelIndex, CachedIndex, build_index
+from .pipeline import run_frames
+from .chunks import render_chunked
+from .strategies import MotionDetector, MotionColourStrategy, SnapshotStrategy, MotionOnlyStrategy
+from .engine import MosaicEngine, MosaicRenderer
+from .live import FrameBudget, run_live
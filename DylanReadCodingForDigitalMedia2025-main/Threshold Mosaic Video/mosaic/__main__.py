@@ -0,0 +1,91 @@
+"""Command line for the mosaic looks.
+
+    python -m mosaic motion   INPUT OUTPUT --dataset DIR [options]
+    python -m mosaic snapshot INPUT OUTPUT --dataset DIR [options]
+    python -m mosaic motion-only INPUT OUTPUT --dataset DIR [options]
+
+INPUT may be a camera index (e.g. 0) to run live in a window; OUTPUT may
+then be - to skip recording. Run from the Threshold Mosaic Video folder;
+--help on each look lists its knobs.
+"""
+import argparse, random
+import numpy as np
+
+from .engine import MosaicRenderer
+from .index import INDEX_KINDS
+from .live import run_live
+from .strategies import MotionColourStrategy, MotionOnlyStrategy, SnapshotStrategy
+
+
+def size(text):
+    """Parse "WxH" into (W, H)."""
+    try:
+        w, h = text.lower().split("x")
+        return int(w), int(h)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WxH, got {text!r}")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("input", help="input video, or a camera index for live mode")
+    common.add_argument("output", help="output .mp4 (- in live mode to not record)")
+    common.add_argument("--dataset", required=True, help="folder of tile images")
+    common.add_argument("--grid", type=size, default=(128, 64), help="mosaic grid in tiles (default 128x64)")
+    common.add_argument("--tile", type=size, default=(64, 64), help="cached tile size in pixels (default 64x64)")
+    common.add_argument("--size", type=size, default=(1080, 720), help="output resolution (default 1080x720)")
+    common.add_argument("--seed", type=int, default=36)
+    common.add_argument("--serial", action="store_true", help="don't overlap decode / mosaic / encode")
+    common.add_argument("--chunks", type=int, default=1, help="render N time ranges in parallel processes")
+    common.add_argument("--check-chunks", action="store_true", help="also render serially and print divergence")
+    common.add_argument("--budget-ms", type=float, help="live mode: mosaic time per frame (default 1/fps)")
+
+    colour = argparse.ArgumentParser(add_help=False)
+    colour.add_argument("--topk", type=int, default=10, help="pick randomly from the closest K tiles")
+    colour.add_argument("--index", choices=INDEX_KINDS, default="exact", help="nearest-tile search")
+    colour.add_argument("--cache-bin", type=float, default=1, help="LAB bin for memoised matches (1 = exact)")
+    colour.add_argument("--cache-size", type=int, default=65536, help="match cache capacity in bins")
+
+    motion = argparse.ArgumentParser(add_help=False)
+    motion.add_argument("--bg-alpha", type=float, default=0.02, help="background learning rate")
+    motion.add_argument("--motion-threshold", type=int, default=32, help="threshold on |frame - background|")
+
+    parser = argparse.ArgumentParser(prog="python -m mosaic", description="Threshold mosaic video renderer")
+    looks = parser.add_subparsers(dest="look", required=True)
+
+    p = looks.add_parser("motion", parents=[common, colour, motion], help="motion + colour threshold with cooldown")
+    p.add_argument("--threshold", type=float, default=18.0, help="LAB distance that forces a re-match")
+    p.add_argument("--cooldown", type=int, default=0, help="frames a tile rests after flipping")
+
+    p = looks.add_parser("snapshot", parents=[common, colour], help="one flip per tile per snapshot window")
+    p.add_argument("--threshold", type=float, default=84, help="LAB distance from the snapshot to flip")
+    p.add_argument("--snap-seconds", type=float, default=0.8, help="snapshot window length")
+
+    looks.add_parser("motion-only", parents=[common, motion], help="random tiles wherever motion is detected")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    if args.look == "motion":
+        strategy = MotionColourStrategy(args.bg_alpha, args.motion_threshold, args.threshold, args.cooldown)
+    elif args.look == "snapshot":
+        strategy = SnapshotStrategy(args.snap_seconds, args.threshold)
+    else:
+        strategy = MotionOnlyStrategy(args.bg_alpha, args.motion_threshold)
+
+    colour = {}
+    if strategy.uses_colour:
+        colour = dict(topk=args.topk, match_index=args.index, cache_bin=args.cache_bin, cache_size=args.cache_size)
+    renderer = MosaicRenderer(strategy, args.dataset, args.grid, args.tile, args.size, **colour)
+    if args.input.isdigit():
+        run_live(renderer, int(args.input), None if args.output == "-" else args.output, args.budget_ms)
+        return
+    renderer.render(args.input, args.output, not args.serial, args.chunks, args.check_chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import os, random, shutil, subprocess, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+
+
+# size of the per-frame thumbnails used to measure divergence
+THUMB_W, THUMB_H = 128, 72
+
+
+def _render_range(job):
+    """Render frames [start, end) of the input in this process.
+
+    Runs `warmup` frames before start through the mosaic stage without
+    writing them, so motion backgrounds / snapshot windows settle first.
+    Returns (frames written, {frame: thumbnail} for the probe frames).
+    """
+    np.random.seed(job["seed"])
+    random.seed(job["seed"])
+
+    first = job["start"] - job["warmup"]
+    process = job["make_process"](job["fps"], first)
+
+    cap = cv2.VideoCapture(job["input"])
+    if first > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    writer = None
+    if job["output"]:
+        writer = cv2.VideoWriter(job["output"], cv2.VideoWriter_fourcc(*"mp4v"), job["fps"], job["size"])
+
+    thumbs, written = {}, 0
+    f = first
+    while job["end"] is None or f < job["end"]:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        out = process(frame)
+        if f >= job["start"]:
+            if writer is not None:
+                writer.write(out)
+            written += 1
+        if f in job["probes"]:
+            thumbs[f] = cv2.resize(out, (THUMB_W, THUMB_H), interpolation=cv2.INTER_AREA)
+        f += 1
+
+    cap.release()
+    if writer is not None:
+        writer.release()
+    return written, thumbs
+
+
+def _concat(segments, output, fps, size):
+    """Join segment files, stream-copying with ffmpeg when it's installed."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        listing = output + ".txt"
+        with open(listing, "w") as fh:
+            for seg in segments:
+                fh.write(f"file '{os.path.abspath(seg)}'\n")
+        try:
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                            "-i", listing, "-c", "copy", output], check=True)
+            return
+        finally:
+            os.remove(listing)
+
+    # no ffmpeg: decode each segment and re-encode into one file
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for seg in segments:
+        cap = cv2.VideoCapture(seg)
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            writer.write(frame)
+        cap.release()
+    writer.release()
+
+
+def render_chunked(make_process, input_video, output_video, size, chunks, workers=None,
+                   warmup=0, align=1, seed=36, compare_serial=False, probe=25):
+    """Split a video into time ranges, render each in its own process, and join them.
+
+    make_process(fps, first_frame) must be a module-level function that
+    returns a fresh process(frame) callable. Chunk starts are rounded to
+    multiples of `align` (e.g. a snapshot window) and each chunk first
+    renders `warmup` unwritten frames before its start.
+
+    compare_serial=True also renders the whole video in one process and
+    prints, per chunk boundary, the mean absolute difference (0-255) of
+    the first `probe` frames against the serial render, next to the same
+    measure for the frames just before the boundary. The serial render is
+    seeded differently from every chunk, so the frames before a boundary
+    differ from it only by random tile picks; that is the baseline.
+    """
+    cap = cv2.VideoCapture(input_video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    step = max(align, -(-total // chunks // align) * align)
+    starts = list(range(0, max(total, 1), step))
+    warmup = -(-warmup // align) * align
+
+    # frames compared against serial: just after and just before each boundary
+    probes = set()
+    if compare_serial:
+        for s in starts[1:]:
+            probes.update(range(max(0, s - probe), min(total, s + probe)))
+
+    tmp = tempfile.mkdtemp(prefix="mosaic_chunks_", dir=os.path.dirname(os.path.abspath(output_video)))
+    jobs = []
+    for i, s in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else None
+        jobs.append({
+            "make_process": make_process, "input": input_video, "fps": fps, "size": size,
+            "start": s, "end": end, "warmup": min(warmup, s), "seed": seed + i,
+            "output": os.path.join(tmp, f"part{i:04d}.mp4"),
+            "probes": {f for f in probes if f >= s and (end is None or f < end)},
+        })
+    if compare_serial:
+        # a seed no chunk uses, so even chunk 0 differs from it by its tile picks
+        jobs.append({
+            "make_process": make_process, "input": input_video, "fps": fps, "size": size,
+            "start": 0, "end": None, "warmup": 0, "seed": seed + len(starts), "output": None, "probes": probes,
+        })
+
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(workers or min(len(jobs), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(_render_range, jobs))
+        parts = results[:len(starts)]
+        segments = [job["output"] for job in jobs[:len(starts)]]
+        _concat(segments, output_video, fps, size)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    elapsed = time.perf_counter() - start_time
+
+    count = sum(n for n, _ in parts)
+    print(f"[CHUNKS] {count} frames in {len(starts)} chunks, {elapsed:.1f}s ({count / elapsed:.1f} fps)")
+
+    if compare_serial:
+        chunked = {}
+        for _, thumbs in parts:
+            chunked.update(thumbs)
+        serial = results[-1][1]
+
+        def diff(frames):
+            frames = [f for f in frames if f in chunked and f in serial]
+            if not frames:
+                return float("nan")
+            return float(np.mean([cv2.absdiff(chunked[f], serial[f]).mean() for f in frames]))
+
+        for s in starts[1:]:
+            after = diff(range(s, s + probe))
+            before = diff(range(s - probe, s))
+            print(f"[CHUNKS] boundary @ frame {s}: divergence {after:.2f} after vs {before:.2f} before")
+    return count
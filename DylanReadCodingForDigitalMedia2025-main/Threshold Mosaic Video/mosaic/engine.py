@@ -0,0 +1,179 @@
+import copy
+import cv2
+import numpy as np
+
+from .chunks import render_chunked
+from .index import CachedIndex, build_index
+from .library import build_tile_cache, load_tile_library, open_tile_cache
+from .matching import pick_tiles, update_tiles
+from .pipeline import run_frames
+from .render import MosaicCompositor
+from .strategies import resample_nearest
+
+
+class MosaicEngine:
+    """Per-render mosaic state; call it with a BGR frame to get a BGR mosaic.
+
+    The strategy decides which cells change each frame; the engine owns the
+    tile library, matching and drawing so every strategy shares them.
+    """
+
+    def __init__(self, strategy, tiles, tile_labs, grid=(128, 64), output_size=(1080, 720),
+                 topk=10, match_index="exact", cache_bin=1, cache_size=65536, fps=25, first_frame=0, index=None):
+        self.strategy = strategy
+        self.tiles = tiles
+        self.tile_labs = tile_labs
+        self.n_tiles = tiles.shape[0]
+        self.grid_w, self.grid_h = grid
+        self.topk = topk
+        self.fps = fps
+        self.frame_no = first_frame
+
+        self.index = None
+        if strategy.uses_colour:
+            # frames repeat colours heavily, so remember top-k lists per LAB bin;
+            # answers don't depend on the grid, so engines may share one
+            self.index = index or CachedIndex(build_index(tile_labs, topk, match_index), cache_bin, cache_size)
+
+        # draws index grids straight at output resolution
+        self.compositor = MosaicCompositor(tiles, self.grid_w, self.grid_h, *output_size)
+
+        # live mode caps re-matches per frame; None = no cap
+        self.max_updates = None
+
+        self.current_idx = None
+        strategy.start(self)
+
+    def rematch(self, update_mask, small_lab, avoid_current=True, limit=None):
+        """Pick a new top-k tile for cells in update_mask; return the cells done.
+
+        With max_updates set (or a smaller limit, for what is left of this
+        frame's share), only a random subset that size is re-matched; the
+        rest keep their tile and stay eligible next frame.
+        """
+        cap = self.max_updates if limit is None else max(0, limit)
+        if cap is not None and np.count_nonzero(update_mask) > cap:
+            cells = np.flatnonzero(update_mask)
+            update_mask = np.zeros_like(update_mask)
+            update_mask.flat[np.random.choice(cells, cap, replace=False)] = True
+
+        update_tiles(self.current_idx, update_mask, small_lab, self.tile_labs, self.topk,
+                     avoid_current, index=self.index)
+        return update_mask
+
+    def take_over(self, previous):
+        """Continue from another engine's state, resampled to this grid (live grid switches)."""
+        self.current_idx = resample_nearest(previous.current_idx, self.grid_h, self.grid_w)
+        self.frame_no = previous.frame_no
+        self.strategy.take_over(self, previous.strategy)
+
+    def match_all(self, small_lab):
+        """Re-pick every cell from its top-k (the current tile is allowed)."""
+        tk = self.index.query(small_lab)
+        self.current_idx[:] = pick_tiles(tk.reshape(-1, tk.shape[-1])).reshape(self.grid_h, self.grid_w)
+
+    def __call__(self, frame):
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        # downsample input video to one pixel per cell
+        small = cv2.resize(rgb, (self.grid_w, self.grid_h))
+        small_lab = None
+        if self.strategy.uses_colour:
+            small_lab = cv2.cvtColor(small, cv2.COLOR_RGB2LAB).astype(np.float32)
+
+        self.strategy.update(self, small, small_lab)
+        self.frame_no += 1
+
+        # Build Mosaic Frame at output resolution (already BGR)
+        return self.compositor.render(self.current_idx)
+
+    def stats(self):
+        return self.index.stats() if self.index is not None else None
+
+
+class MosaicRenderer:
+    """One mosaic look: strategy + dataset + sizes, ready to render videos.
+
+    Calling it as renderer(fps, first_frame) builds a fresh MosaicEngine,
+    which is what chunk worker processes do, so it must stay picklable.
+    """
+
+    def __init__(self, strategy, dataset_dir, grid=(128, 64), tile=(64, 64), output_size=(1080, 720),
+                 topk=10, match_index="exact", cache_bin=1, cache_size=65536):
+        self.strategy = strategy
+        self.dataset_dir = dataset_dir
+        self.grid = grid
+        self.tile = tile
+        self.output_size = output_size
+        self.topk = topk
+        self.match_index = match_index
+        self.cache_bin = cache_bin
+        self.cache_size = cache_size
+
+        # set on the copy handed to chunk workers: a tile cache already built
+        # by the parent, so workers only memory-map it
+        self.library_dir = None
+
+    def load_library(self):
+        # resized tiles + LAB means, memory-mapped from the on-disk cache
+        if self.library_dir is not None:
+            return open_tile_cache(self.library_dir)
+        return load_tile_library(self.dataset_dir, *self.tile)
+
+    def __call__(self, fps, first_frame=0, grid=None):
+        tiles, tile_labs = self.load_library()
+        return MosaicEngine(copy.deepcopy(self.strategy), tiles, tile_labs, grid or self.grid, self.output_size,
+                            self.topk, self.match_index, self.cache_bin, self.cache_size, fps, first_frame)
+
+    def build_levels(self, fps, grids):
+        """One engine per grid, sharing a single library load and match index.
+
+        Live mode builds these up front so a grid switch costs nothing
+        mid-stream; see MosaicEngine.take_over.
+        """
+        tiles, tile_labs = self.load_library()
+        engines, index = [], None
+        for grid in grids:
+            engine = MosaicEngine(copy.deepcopy(self.strategy), tiles, tile_labs, grid, self.output_size,
+                                  self.topk, self.match_index, self.cache_bin, self.cache_size, fps, index=index)
+            index = engine.index
+            engines.append(engine)
+        return engines
+
+    def render(self, input_video, output_video, threaded=True, chunks=1, check_chunks=False):
+        """Render input_video to output_video; chunks > 1 uses worker processes."""
+        cap = cv2.VideoCapture(input_video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+
+        if chunks > 1:
+            # motion looks warm their background up, snapshots align to windows
+            cap.release()
+
+            # build / refresh the tile cache once here, not in every worker at once
+            worker_renderer = copy.copy(self)
+            try:
+                worker_renderer.library_dir = build_tile_cache(self.dataset_dir, *self.tile)
+            except OSError as e:
+                print("[CACHE] unavailable, each chunk decodes in memory:", e)
+            render_chunked(worker_renderer, input_video, output_video, self.output_size, chunks,
+                           warmup=self.strategy.chunk_warmup(fps), align=self.strategy.chunk_align(fps),
+                           compare_serial=check_chunks)
+            print("[DONE] Saved:", output_video)
+            return
+
+        engine = self(fps)
+        writer = cv2.VideoWriter(
+            output_video,
+            cv2.VideoWriter_fourcc(*"mp4v"),
+            fps,
+            self.output_size
+        )
+
+        run_frames(cap, writer, engine, threaded)
+
+        # shutdown
+        cap.release()
+        writer.release()
+        if engine.stats() is not None:
+            print("[MATCH] cache:", engine.stats())
+        print("[DONE] Saved:", output_video)
@@ -0,0 +1,246 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from .matching import CHUNK_BYTES, topk_match_grid
+
+
+# 8-bit OpenCV LAB puts every channel in 0..255
+LAB_RANGE = 256.0
+
+
+class BruteForceIndex:
+    """Scores every query against every tile (what topk_match always did)."""
+
+    def __init__(self, tile_labs, k):
+        self.tile_labs = np.asarray(tile_labs, np.float32)
+        self.k = min(k, len(self.tile_labs))
+
+    def query(self, target_labs):
+        """Return the k closest tile indices for every target LAB, nearest first."""
+        return topk_match_grid(target_labs, self.tile_labs, self.k)
+
+
+class VoxelIndex:
+    """Uniform LAB voxel grid over the tile library, filled in lazily.
+
+    bins grows with the library (32 per axis at 1000 tiles, times
+    (N / 1000)^(1/3), up to MAX_BINS), so voxels shrink as it fills and
+    their candidate lists stay about the same length whatever N is.
+
+    exact=True keeps, per voxel, only the tiles that could be in the top-k
+    for *some* point inside it (their nearest box distance is within the
+    k-th best farthest box distance), then scores queries against that short
+    list, so results match the brute-force search. Building a voxel only
+    looks at the tiles in the voxels around it, never the whole library.
+
+    exact=False is a quantised palette lookup: every query in a voxel gets
+    the top-k of the voxel centre, one table read per cell.
+    """
+
+    MAX_BINS = 128
+
+    def __init__(self, tile_labs, k, bins=None, exact=True):
+        self.tile_labs = np.asarray(tile_labs, np.float32)
+        n = len(self.tile_labs)
+        self.k = min(k, n)
+        self.bins = bins or int(np.clip(round(32 * (n / 1000) ** (1 / 3)), 8, self.MAX_BINS))
+        self.size = LAB_RANGE / self.bins
+        self.exact = exact
+
+        # tiles sorted by voxel, so a block of voxels is a few slices
+        n_vox = self.bins ** 3
+        tile_vox = self.voxel_of(self.tile_labs)
+        self.order = np.argsort(tile_vox, kind="stable")
+        self.starts = np.searchsorted(tile_vox[self.order], np.arange(n_vox + 1))
+        self.counts = np.diff(self.starts).reshape((self.bins,) * 3)
+
+        self.built = np.zeros(n_vox, bool)
+        if exact:
+            self.candidates = {}
+        else:
+            # rows are added as voxels are built; row[v] is voxel v's row
+            self.row = np.full(n_vox, -1, np.intp)
+            self.table = np.zeros((0, self.k), np.intp)
+
+    def voxel_of(self, labs):
+        """Flat voxel id for each (..., 3) LAB value."""
+        v = np.clip((labs / self.size).astype(np.intp), 0, self.bins - 1)
+        return (v[..., 0] * self.bins + v[..., 1]) * self.bins + v[..., 2]
+
+    def _tiles_in(self, ranges):
+        # tile indices in the block of voxels spanned by per-axis [start, stop)
+        grid = np.ix_(*(np.arange(a0, a1) for a0, a1 in ranges))
+        vox = ((grid[0] * self.bins + grid[1]) * self.bins + grid[2]).reshape(-1)
+        start, stop = self.starts[vox], self.starts[vox + 1]
+        sizes = stop - start
+        pos = np.arange(sizes.sum()) + np.repeat(start - (np.cumsum(sizes) - sizes), sizes)
+        return self.order[pos]
+
+    def _block(self, cell, r):
+        # per-axis voxel ranges r voxels either side of cell
+        return [(max(0, c - r), min(self.bins, c + r + 1)) for c in cell]
+
+    def _candidates(self, vox):
+        cell = np.unravel_index(vox, (self.bins,) * 3)
+        lo = (np.array(cell) * self.size).astype(np.float32)
+        hi = lo + np.float32(self.size)
+
+        # any k tiles bound the k-th best farthest box distance: grow a
+        # block around the voxel until it holds k of them
+        r = 0
+        while self.counts[tuple(slice(a0, a1) for a0, a1 in self._block(cell, r))].sum() < self.k:
+            r += 1
+        labs = self.tile_labs[self._tiles_in(self._block(cell, r))]
+        far = np.maximum(np.abs(labs - lo), np.abs(labs - hi))
+        bound = np.partition(np.sum(far * far, axis=1), self.k - 1)[self.k - 1]
+
+        # tiles within the bound of the box sit within this many voxels of it
+        reach = int(np.ceil(np.sqrt(bound) / self.size)) + 1
+        tiles = self._tiles_in(self._block(cell, reach))
+        labs = self.tile_labs[tiles]
+        near = np.maximum(np.maximum(lo - labs, labs - hi), 0)
+        return tiles[np.sum(near * near, axis=1) <= bound], (lo + hi) / 2
+
+    def _build(self, voxels):
+        if not self.exact:
+            self.row[voxels] = len(self.table) + np.arange(len(voxels))
+            self.table = np.concatenate([self.table, np.empty((len(voxels), self.k), np.intp)])
+
+        for vox in voxels.tolist():
+            cand, centre = self._candidates(vox)
+            if self.exact:
+                self.candidates[vox] = cand
+            else:
+                # the centre is inside the box, so its top-k are among cand
+                diff = self.tile_labs[cand] - centre
+                order = np.argsort(np.sum(diff * diff, axis=1), kind="stable")
+                self.table[self.row[vox]] = cand[order[:self.k]]
+        self.built[voxels] = True
+
+    def query(self, target_labs):
+        """Return the k closest tile indices for every target LAB, nearest first."""
+        lead = np.shape(target_labs)[:-1]
+        targets = np.asarray(target_labs, np.float32).reshape(-1, 3)
+        vox = self.voxel_of(targets)
+
+        todo = np.unique(vox[~self.built[vox]])
+        if len(todo):
+            self._build(todo)
+
+        if not self.exact:
+            return self.table[self.row[vox]].reshape(lead + (self.k,))
+
+        used, slot = np.unique(vox, return_inverse=True)
+        lists = [self.candidates[v] for v in used.tolist()]
+        widths = np.array([len(c) for c in lists])
+
+        # score cells in groups of similar list length (powers of two), so
+        # one crowded voxel doesn't pad every row to its width
+        group = np.ceil(np.log2(np.maximum(widths, 1))).astype(np.intp)[slot]
+        out = np.empty((len(targets), self.k), np.intp)
+        for g in np.unique(group).tolist():
+            cells = np.flatnonzero(group == g)
+            members, local = np.unique(slot[cells], return_inverse=True)
+            width = int(widths[members].max())
+            cand = np.full((len(members), width), -1, np.intp)
+            for i, m in enumerate(members.tolist()):
+                cand[i, :widths[m]] = lists[m]
+
+            rows = max(1, CHUNK_BYTES // max(1, width * 3 * 4))
+            for s in range(0, len(cells), rows):
+                idx = cand[local[s:s + rows]]
+                diff = self.tile_labs[idx] - targets[cells[s:s + rows], None, :]
+                dist = np.sum(diff * diff, axis=2)
+                dist[idx < 0] = np.inf
+
+                part = np.argpartition(dist, self.k - 1, axis=1)[:, :self.k] if self.k < width \
+                    else np.broadcast_to(np.arange(width), dist.shape)
+                order = np.argsort(np.take_along_axis(dist, part, axis=1), axis=1, kind="stable")
+                out[cells[s:s + rows]] = np.take_along_axis(idx, np.take_along_axis(part, order, axis=1), axis=1)
+
+        return out.reshape(lead + (self.k,))
+
+
+class CachedIndex:
+    """Bounded LRU memo of top-k lists in front of another index.
+
+    Queries are keyed on LAB quantised to bin_size; a miss asks the inner
+    index about the bin's own value. LAB from 8-bit frames is whole
+    numbers, so bin_size=1 gives exactly the inner index's answers.
+
+    Lists live in one preallocated (capacity, k) table and the LRU maps a
+    key to its row, so the memo never holds more than capacity * k ints.
+    """
+
+    def __init__(self, index, bin_size=1, capacity=65536):
+        self.index = index
+        self.k = index.k
+        self.bin_size = bin_size
+        self.capacity = capacity
+        self.radix = int(LAB_RANGE // bin_size) + 2
+        self.table = np.empty((capacity, self.k), np.intp)
+        self.lists = OrderedDict()      # key -> row of table, oldest first
+        self.hits = self.misses = self.evictions = 0
+
+    def query(self, target_labs):
+        """Return the k closest tile indices for every target LAB, nearest first."""
+        lead = np.shape(target_labs)[:-1]
+        q = np.rint(np.asarray(target_labs, np.float32).reshape(-1, 3) / self.bin_size).astype(np.intp)
+        keys = (q[:, 0] * self.radix + q[:, 1]) * self.radix + q[:, 2]
+        used, first, slot, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+
+        out = np.empty((len(used), self.k), np.intp)
+        missing, found, rows = [], [], []
+        for i, key in enumerate(used.tolist()):
+            row = self.lists.get(key)
+            if row is None:
+                missing.append(i)
+            else:
+                self.lists.move_to_end(key)
+                found.append(i)
+                rows.append(row)
+        if found:
+            out[found] = self.table[rows]
+
+        if missing:
+            missing = np.array(missing)
+            out[missing] = self.index.query(q[first[missing]] * np.float32(self.bin_size))
+            for i in missing.tolist():
+                # rows are handed out in order until the table is full,
+                # then each new list takes the least recently used row
+                if len(self.lists) < self.capacity:
+                    row = len(self.lists)
+                else:
+                    _, row = self.lists.popitem(last=False)
+                    self.evictions += 1
+                self.table[row] = out[i]
+                self.lists[used[i].item()] = row
+
+        n_miss = int(counts[missing].sum()) if len(missing) else 0
+        self.misses += n_miss
+        self.hits += len(keys) - n_miss
+        return out[slot].reshape(lead + (self.k,))
+
+    def stats(self):
+        """Hit/miss counters (per queried cell) and current size."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self.lists),
+        }
+
+
+INDEX_KINDS = ("brute", "exact", "approx")
+
+
+def build_index(tile_labs, k, kind="exact", bins=None):
+    """Make a nearest-tile index: "brute", "exact" (voxel) or "approx" (palette)."""
+    if kind == "brute":
+        return BruteForceIndex(tile_labs, k)
+    if kind in ("exact", "approx"):
+        return VoxelIndex(tile_labs, k, bins, exact=(kind == "exact"))
+    raise ValueError(f"unknown index kind {kind!r}, expected one of {INDEX_KINDS}")
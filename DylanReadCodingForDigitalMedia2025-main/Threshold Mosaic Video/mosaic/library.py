@@ -0,0 +1,284 @@
+import os, glob, json, shutil, time, uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+
+
+# bump when the cached arrays change meaning (tile decode, LAB maths, layout)
+CACHE_VERSION = 2
+CACHE_DIRNAME = ".tilecache"
+STALE_BUILD_AGE = 3600        # seconds before an unreferenced data-* folder is removed
+IMAGE_EXTS = ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.webp")
+
+
+def list_images(folder):
+    """Return sorted list of image files in a folder."""
+    out = []
+    for e in IMAGE_EXTS:
+        out.extend(glob.glob(os.path.join(folder, e)))
+    return sorted(out)
+
+
+def load_tile(path, tile_w, tile_h):
+    """Decode one image into an RGB tile and its mean LAB, or None if unreadable."""
+    img = cv2.imread(path)
+    if img is None:
+        return None
+
+    # standardise format + size
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img = cv2.resize(img, (tile_w, tile_h), interpolation=cv2.INTER_AREA)
+
+    # compute mean LAB value for tile comparison
+    lab = cv2.cvtColor(img, cv2.COLOR_RGB2LAB)
+    return img, lab.reshape(-1, 3).mean(0).astype(np.float32)
+
+
+# per-worker views onto the shared output arrays (set by _attach)
+_shared = {}
+
+
+def _attach(tiles_name, labs_name, n, tile_w, tile_h):
+    tiles_shm = shared_memory.SharedMemory(name=tiles_name)
+    labs_shm = shared_memory.SharedMemory(name=labs_name)
+    _shared["shm"] = (tiles_shm, labs_shm)
+    _shared["size"] = (tile_w, tile_h)
+    _shared["tiles"] = np.ndarray((n, tile_h, tile_w, 3), np.uint8, tiles_shm.buf)
+    _shared["labs"] = np.ndarray((n, 3), np.float32, labs_shm.buf)
+
+
+def _worker_init(*args):
+    # one OpenCV thread per process, the pool already covers the cores
+    cv2.setNumThreads(1)
+    _attach(*args)
+
+
+def _decode_chunk(job):
+    """Decode one run of files straight into shared memory; return bad indices."""
+    start, paths = job
+    bad = []
+    for i, path in enumerate(paths, start):
+        try:
+            tile = load_tile(path, *_shared["size"])
+        except cv2.error:
+            tile = None
+        if tile is None:
+            bad.append(i)
+            continue
+        _shared["tiles"][i], _shared["labs"][i] = tile
+    return bad
+
+
+def decode_tiles(files, tile_w, tile_h, workers=None, verbose=True, chunk=64):
+    """Decode files in a process pool; return (tiles, labs, unreadable files).
+
+    Workers write into shared memory at each file's own row, so the result
+    keeps the order of files no matter which worker finishes first.
+    """
+    n = len(files)
+    if n == 0:
+        return np.empty((0, tile_h, tile_w, 3), np.uint8), np.empty((0, 3), np.float32), []
+    workers = min(workers or os.cpu_count() or 1, -(-n // chunk))
+
+    tiles_shm = shared_memory.SharedMemory(create=True, size=n * tile_h * tile_w * 3)
+    labs_shm = shared_memory.SharedMemory(create=True, size=n * 3 * 4)
+    args = (tiles_shm.name, labs_shm.name, n, tile_w, tile_h)
+    jobs = [(s, files[s:s + chunk]) for s in range(0, n, chunk)]
+    try:
+        if workers <= 1:
+            _attach(*args)
+            bad = [i for b in map(_decode_chunk, jobs) for i in b]
+            _shared.clear()
+        else:
+            with ProcessPoolExecutor(workers, initializer=_worker_init, initargs=args) as pool:
+                bad = [i for b in pool.map(_decode_chunk, jobs) for i in b]
+
+        # compact the good rows, still in file order
+        ok = np.ones(n, bool)
+        ok[bad] = False
+        tiles = np.ndarray((n, tile_h, tile_w, 3), np.uint8, tiles_shm.buf)[ok]
+        labs = np.ndarray((n, 3), np.float32, labs_shm.buf)[ok]
+    finally:
+        tiles_shm.close()
+        tiles_shm.unlink()
+        labs_shm.close()
+        labs_shm.unlink()
+
+    bad_files = [files[i] for i in bad]
+    if verbose:
+        for f in bad_files:
+            print("[SKIP] unreadable image:", f)
+    return tiles, labs, bad_files
+
+
+def cache_path(dataset_dir, tile_w, tile_h, cache_dir=None):
+    """Folder holding the cached library for one dataset + tile size.
+
+    Inside, manifest.json names a data-* folder holding tiles.npy and
+    labs.npy. A data folder is never changed once written; a rebuild writes
+    a new one and publishes it by replacing the manifest in one os.replace,
+    so a reader always sees arrays and manifest from the same build.
+    """
+    root = cache_dir or os.path.join(dataset_dir, CACHE_DIRNAME)
+    return os.path.join(root, f"{tile_w}x{tile_h}")
+
+
+def _read_manifest(folder):
+    try:
+        with open(os.path.join(folder, "manifest.json")) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    if not os.path.isdir(os.path.join(folder, manifest.get("data", ""))):
+        return None
+    return manifest
+
+
+def _publish(folder, manifest):
+    # manifest to a private temp name, then swapped in atomically
+    tmp = os.path.join(folder, f"manifest.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, os.path.join(folder, "manifest.json"))
+
+
+def _sweep(folder, keep):
+    # Drop data folders nobody should need: not the current build, not the
+    # one it replaced (a reader may have just read the old manifest), and
+    # old enough that no other builder is still writing it. Crashed builds
+    # go the same way.
+    now = time.time()
+    for name in os.listdir(folder):
+        stale = name.startswith("data-") and name not in keep or name.startswith("manifest.") and name.endswith(".tmp")
+        if not stale:
+            continue
+        path = os.path.join(folder, name)
+        try:
+            if now - os.path.getmtime(path) > STALE_BUILD_AGE:
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+        except OSError:
+            pass    # another process got there first, or the OS is still holding it
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def build_tile_cache(dataset_dir, tile_w, tile_h, cache_dir=None, workers=None, verbose=True):
+    """Create or refresh the on-disk tile cache; return the data folder to load.
+
+    Only files that are new or whose mtime/size changed get decoded, the
+    rest are copied over from the previous cache. Each build writes its own
+    data folder, so concurrent builders never touch each other's files.
+    """
+    folder = cache_path(dataset_dir, tile_w, tile_h, cache_dir)
+    os.makedirs(folder, exist_ok=True)
+
+    files = list_images(dataset_dir)
+    keys = {f: _file_key(f) for f in files}
+
+    old = _read_manifest(folder)
+    old_rows, old_skipped = {}, {}
+    if old and old["tile"] == [tile_w, tile_h]:
+        old_rows = {name: (i, key) for i, (name, key) in enumerate(old["files"])}
+        old_skipped = dict(old["skipped"])
+
+    # nothing added, removed or touched -> keep the cache as it is
+    def known(f):
+        name = os.path.basename(f)
+        return old_rows.get(name, (None, None))[1] == keys[f] or old_skipped.get(name) == keys[f]
+
+    if old_rows and all(known(f) for f in files) and len(files) == len(old_rows) + len(old_skipped):
+        return os.path.join(folder, old["data"])
+
+    old_tiles = old_labs = None
+    if old_rows:
+        old_tiles = np.load(os.path.join(folder, old["data"], "tiles.npy"), mmap_mode="r")
+        old_labs = np.load(os.path.join(folder, old["data"], "labs.npy"), mmap_mode="r")
+
+    # decode everything new or touched in one parallel batch
+    stale = [f for f in files if not known(f)]
+    new_tiles, new_labs, bad = decode_tiles(stale, tile_w, tile_h, workers, verbose)
+    bad = set(bad)
+    new_rows = {}
+    for f in stale:
+        if f not in bad:
+            new_rows[f] = len(new_rows)
+
+    imgs, labs, entries, skipped = [], [], [], []
+    for f in files:
+        name = os.path.basename(f)
+        row, key = old_rows.get(name, (None, None))
+        if key == keys[f]:
+            imgs.append(old_tiles[row])
+            labs.append(old_labs[row])
+            entries.append([name, key])
+        elif f in new_rows:
+            imgs.append(new_tiles[new_rows[f]])
+            labs.append(new_labs[new_rows[f]])
+            entries.append([name, keys[f]])
+        else:
+            skipped.append([name, keys[f]])
+
+    if not imgs:
+        raise ValueError(f"no readable images in {dataset_dir}")
+
+    # write a private data folder, then publish it with the manifest
+    data = f"data-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    data_dir = os.path.join(folder, data)
+    os.makedirs(data_dir)
+    try:
+        out = np.lib.format.open_memmap(os.path.join(data_dir, "tiles.npy"), "w+", np.uint8,
+                                        (len(imgs), tile_h, tile_w, 3))
+        for i, im in enumerate(imgs):
+            out[i] = im
+        out.flush()
+        del out, old_tiles, old_labs, new_tiles, imgs
+        np.save(os.path.join(data_dir, "labs.npy"), np.stack(labs).astype(np.float32))
+        _publish(folder, {
+            "version": CACHE_VERSION,
+            "tile": [tile_w, tile_h],
+            "data": data,
+            "files": entries,
+            "skipped": skipped,
+        })
+    except BaseException:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        raise
+
+    _sweep(folder, keep={data, old and old.get("data")})
+
+    if verbose:
+        print(f"[CACHE] {len(entries)} tiles ({len(stale)} decoded, {len(skipped)} unreadable) -> {data_dir}")
+    return data_dir
+
+
+def open_tile_cache(data_dir):
+    """Memory-map (tiles, tile_labs) from a data folder returned by build_tile_cache."""
+    tiles = np.load(os.path.join(data_dir, "tiles.npy"), mmap_mode="r")
+    labs = np.load(os.path.join(data_dir, "labs.npy"), mmap_mode="r")
+    return tiles, labs
+
+
+def load_tile_library(dataset_dir, tile_w, tile_h, cache_dir=None, use_cache=True, workers=None):
+    """Return (tiles, tile_labs), memory-mapped from the cache when possible.
+
+    Falls back to decoding the whole dataset in the process pool if the
+    cache is disabled or can't be written (e.g. a read-only dataset).
+    """
+    if use_cache:
+        try:
+            folder = build_tile_cache(dataset_dir, tile_w, tile_h, cache_dir, workers)
+        except OSError as e:
+            print("[CACHE] unavailable, decoding in memory:", e)
+        else:
+            return open_tile_cache(folder)
+
+    tiles, labs, _ = decode_tiles(list_images(dataset_dir), tile_w, tile_h, workers)
+    if len(tiles) == 0:
+        raise ValueError(f"no readable images in {dataset_dir}")
+    return tiles, labs
@@ -0,0 +1,133 @@
+import time
+import cv2
+import numpy as np
+
+
+class FrameBudget:
+    """Keeps per-frame mosaic time under budget_ms by degrading in steps.
+
+    Over budget it first shrinks how many cells may re-match per frame (the
+    rest wait for a later frame), down to none at all; if that still isn't
+    enough for `patience` frames it asks for a coarser grid. With headroom
+    it climbs back the same way.
+    """
+
+    def __init__(self, budget_ms, cells, patience=15):
+        self.budget_ms = budget_ms
+        self.patience = patience
+        self.reset(cells)
+
+    def reset(self, cells):
+        self.cells = cells
+        self.limit = cells
+        self.over = self.under = 0
+
+    @property
+    def max_updates(self):
+        # None = no cap, which keeps the engine on its offline code path
+        return None if self.limit >= self.cells else self.limit
+
+    def update(self, elapsed_ms):
+        """Feed one frame's mosaic time; return -1 / +1 to step the grid down / up, else 0."""
+        if elapsed_ms > self.budget_ms:
+            self.under = 0
+            if self.limit > 0:
+                self.limit = int(self.limit * 0.7)
+                return 0
+            self.over += 1
+            return -1 if self.over >= self.patience else 0
+
+        self.over = 0
+        if elapsed_ms < 0.8 * self.budget_ms and self.limit < self.cells:
+            self.limit = min(self.cells, int(self.limit * 1.2) + 16)
+            return 0
+        if elapsed_ms < 0.5 * self.budget_ms and self.limit >= self.cells:
+            self.under += 1
+            return 1 if self.under >= self.patience else 0
+        self.under = 0
+        return 0
+
+
+def _percentiles(ms):
+    if not ms:
+        return "n/a"
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return f"p50 {p50:.1f} / p90 {p90:.1f} / p99 {p99:.1f} / max {max(ms):.1f} ms"
+
+
+def run_live(renderer, camera=0, output=None, budget_ms=None, levels=2, show=True, max_frames=None):
+    """Run a mosaic look on a live camera (or any VideoCapture source) in a window.
+
+    Each frame's mosaic work is held to budget_ms (default one frame period)
+    by FrameBudget: fewer cells re-match when it's over, then none, then
+    the grid halves (up to `levels` - 1 times). The cap covers snapshot
+    window starts too: under it the rebuild from the new snapshot is spread
+    over the following frames instead of re-matching the whole grid at once.
+    Every level's engine is
+    built before the first frame; a switch hands the current tiles and
+    motion state to the other grid's engine, so the picture carries on and
+    the frame it happens on only pays for the resample. Press q or Esc to
+    stop; latency percentiles (switches included) are printed at the end.
+    Returns the number of frames shown.
+    """
+    cap = cv2.VideoCapture(camera)
+    if not cap.isOpened():
+        raise RuntimeError(f"could not open camera {camera!r}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    budget_ms = budget_ms or 1000.0 / fps
+
+    gw, gh = renderer.grid
+    grids = [(max(1, gw >> i), max(1, gh >> i)) for i in range(levels)]
+    level = 0
+    engines = renderer.build_levels(fps, grids)
+    engine = engines[level]
+    budget = FrameBudget(budget_ms, gw * gh)
+
+    writer = None
+    if output:
+        writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*"mp4v"), fps, renderer.output_size)
+
+    mosaic_ms, frame_ms, switch_ms = [], [], []
+    degraded = 0
+    try:
+        while max_frames is None or len(frame_ms) < max_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t0 = time.perf_counter()
+
+            engine.max_updates = budget.max_updates
+            degraded += engine.max_updates is not None or level > 0
+            out = engine(frame)
+            t1 = time.perf_counter()
+
+            if writer is not None:
+                writer.write(out)
+            if show:
+                cv2.imshow("mosaic", out)
+                if cv2.waitKey(1) & 0xFF in (27, ord("q")):
+                    break
+            mosaic_ms.append((t1 - t0) * 1000)
+
+            step = budget.update(mosaic_ms[-1])
+            if step and 0 <= level - step < levels:
+                level -= step
+                t_switch = time.perf_counter()
+                engines[level].take_over(engine)
+                engine = engines[level]
+                budget.reset(grids[level][0] * grids[level][1])
+                switch_ms.append((time.perf_counter() - t_switch) * 1000)
+            frame_ms.append((time.perf_counter() - t0) * 1000)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+        if show:
+            cv2.destroyAllWindows()
+
+    n = len(frame_ms)
+    print(f"[LIVE] {n} frames, budget {budget_ms:.1f} ms, {degraded} degraded, {len(switch_ms)} grid switches"
+          + (f" (max {max(switch_ms):.1f} ms)" if switch_ms else ""))
+    print(f"[LIVE] mosaic  {_percentiles(mosaic_ms)}")
+    print(f"[LIVE] frame   {_percentiles(frame_ms)}")
+    return n
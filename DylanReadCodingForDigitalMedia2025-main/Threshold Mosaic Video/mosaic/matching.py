@@ -0,0 +1,78 @@
+import numpy as np
+
+
+# cap on the (cells, tiles, 3) difference array built per chunk
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def topk_match_grid(target_labs, tile_labs, k, chunk_bytes=CHUNK_BYTES):
+    """Return the k closest tile indices for every target LAB, nearest first.
+
+    target_labs can be any (..., 3) array (a whole grid or a list of cells);
+    the result has shape (..., k).
+    """
+    lead = np.shape(target_labs)[:-1]
+    targets = np.asarray(target_labs, np.float32).reshape(-1, 3)
+    tile_labs = np.asarray(tile_labs, np.float32)
+    n = len(tile_labs)
+    k = min(k, n)
+
+    out = np.empty((len(targets), k), np.intp)
+
+    # score cells in chunks so big libraries don't blow up memory
+    rows = max(1, chunk_bytes // max(1, n * 3 * 4))
+    for s in range(0, len(targets), rows):
+        q = targets[s:s + rows]
+        diff = tile_labs[None, :, :] - q[:, None, :]
+        dist = np.sum(diff * diff, axis=2)   # squared Euclidean distance
+
+        # partial sort to get top-k indices for every cell at once
+        if k < n:
+            idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(n), dist.shape)
+        order = np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1, kind="stable")
+        out[s:s + rows] = np.take_along_axis(idx, order, axis=1)
+
+    return out.reshape(lead + (k,))
+
+
+def pick_tiles(candidates, current=None, rng=np.random):
+    """Pick one candidate per row at random, avoiding the current tile if possible.
+
+    candidates is (M, k); current is (M,) or None to allow any candidate.
+    rng can be the np.random module or a Generator.
+    """
+    m, k = candidates.shape
+    rows = np.arange(m)
+
+    if current is None:
+        slot = (rng.random(m) * k).astype(np.intp)
+        return candidates[rows, slot]
+
+    # choose the r-th candidate that isn't the current tile
+    valid = candidates != np.asarray(current)[:, None]
+    count = valid.sum(axis=1)
+    r = (rng.random(m) * count).astype(np.intp)
+    slot = np.argmax(np.cumsum(valid, axis=1) > r[:, None], axis=1)
+
+    # nothing else to choose from -> keep the best match
+    return np.where(count > 0, candidates[rows, slot], candidates[:, 0])
+
+
+def update_tiles(current_idx, update_mask, target_labs, tile_labs, k,
+                 avoid_current=True, rng=np.random, index=None):
+    """Re-match every cell in update_mask in place; return how many changed.
+
+    index is an optional nearest-tile index (see mosaic.index) built for
+    the same tile_labs and k; without one every tile is scored.
+    """
+    n_update = int(np.count_nonzero(update_mask))
+    if n_update == 0:
+        return 0
+
+    targets = target_labs[update_mask]
+    tk = index.query(targets) if index is not None else topk_match_grid(targets, tile_labs, k)
+    current = current_idx[update_mask] if avoid_current else None
+    current_idx[update_mask] = pick_tiles(tk, current, rng)
+    return n_update
@@ -0,0 +1,6 @@
+import os, sys
+
+# the threaded decode / process / encode loop is shared with the other
+# headless renderers and lives in sketch_profiler at the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from sketch_profiler import run_frames  # noqa: E402,F401
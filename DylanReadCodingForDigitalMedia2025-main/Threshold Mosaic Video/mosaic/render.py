@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+
+
+class MosaicCompositor:
+    """Draws a grid of tile indices straight into an output-sized frame.
+
+    Gives the same image as pasting every tile into a (GRID_H*TILE_H,
+    GRID_W*TILE_W) canvas and cv2.resize-ing it with INTER_NEAREST, without
+    ever building that canvas.
+    """
+
+    def __init__(self, tiles, grid_w, grid_h, out_w, out_h, bgr=True):
+        n, tile_h, tile_w = tiles.shape[:3]
+        src_h, src_w = grid_h * tile_h, grid_w * tile_w
+        self.grid_w, self.grid_h = grid_w, grid_h
+
+        # source canvas pixel each output pixel samples (cv2.INTER_NEAREST rule)
+        sy = np.minimum((np.arange(out_h) * (src_h / out_h)).astype(np.intp), src_h - 1)
+        sx = np.minimum((np.arange(out_w) * (src_w / out_w)).astype(np.intp), src_w - 1)
+
+        # which grid cell, and which pixel inside its tile
+        cell_y, py = np.divmod(sy, tile_h)
+        cell_x, px = np.divmod(sx, tile_w)
+        self.cell = cell_y[:, None] * grid_w + cell_x[None, :]
+
+        # gather straight from the library (memory-mapped when it comes from
+        # the tile cache, so the pages stay shared): every pixel of every
+        # tile is one row of a (n * tile_h * tile_w, 3) view, no private copy
+        self.tiles = np.ascontiguousarray(tiles, np.uint8).reshape(-1, 3)
+        self.tile_stride = tile_h * tile_w
+        self.offset = py[:, None] * tile_w + px[None, :]
+        self.bgr = bgr
+
+        # reusable per-frame buffers
+        self.lookup = np.empty((out_h, out_w), np.intp)
+        self.frame = np.empty((out_h, out_w, 3), np.uint8)
+        self.out = np.empty((out_h, out_w, 3), np.uint8) if bgr else self.frame
+
+    def render(self, current_idx):
+        """Return the mosaic for a (grid_h, grid_w) index grid.
+
+        The returned array is reused on the next call; copy it to keep it.
+        """
+        flat_idx = np.asarray(current_idx, np.intp).reshape(-1)
+
+        # one gather for the tile of every output pixel, one for the pixels
+        np.take(flat_idx, self.cell, out=self.lookup, mode="clip")
+        self.lookup *= self.tile_stride
+        self.lookup += self.offset
+        np.take(self.tiles, self.lookup, axis=0, out=self.frame, mode="clip")
+        if self.bgr:
+            # library is RGB; swap once on the finished frame for the writer
+            cv2.cvtColor(self.frame, cv2.COLOR_RGB2BGR, dst=self.out)
+        return self.out
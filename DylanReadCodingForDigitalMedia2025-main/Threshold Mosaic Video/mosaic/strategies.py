@@ -0,0 +1,177 @@
+import cv2
+import numpy as np
+
+
+def resample_nearest(grid, h, w):
+    """Per-cell state (indices, flags, counters) resampled to an h x w grid."""
+    rows = np.arange(h) * grid.shape[0] // h
+    cols = np.arange(w) * grid.shape[1] // w
+    return grid[rows[:, None], cols[None, :]]
+
+
+def resample_area(image, h, w):
+    """Per-cell colour state (backgrounds, snapshots) averaged onto an h x w grid."""
+    return cv2.resize(image, (w, h), interpolation=cv2.INTER_AREA)
+
+
+class MotionDetector:
+    """Moving-average background model that flags cells that moved."""
+
+    def __init__(self, alpha=0.02, threshold=32):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.background = None
+
+    def __call__(self, small):
+        """Return a boolean (GRID_H, GRID_W) motion mask for one RGB grid frame."""
+        if self.background is None:
+            # seed background with first frame
+            self.background = small.astype(np.float32)
+
+        # update moving-average background
+        cv2.accumulateWeighted(small, self.background, self.alpha)
+        bg_uint8 = self.background.astype(np.uint8)
+
+        # compute absolute difference from background
+        diff = cv2.absdiff(small, bg_uint8)
+        gray = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
+
+        # threshold into a binary motion mask
+        _, motion_mask = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        return motion_mask > 0
+
+    def warmup_frames(self):
+        # about three time constants of the EMA (~5% of the seed frame left)
+        return int(round(3.0 / self.alpha))
+
+    def take_over(self, previous, h, w):
+        # carry a settled background across a grid change instead of re-seeding
+        if previous.background is not None:
+            self.background = resample_area(previous.background, h, w)
+
+
+class MotionColourStrategy:
+    """Flip a tile on motion OR a big LAB deviation, then rest for a cooldown."""
+
+    uses_colour = True
+
+    def __init__(self, bg_alpha=0.02, motion_threshold=32, stability_threshold=18.0, cooldown_frames=0):
+        self.motion = MotionDetector(bg_alpha, motion_threshold)
+        self.stability_threshold = stability_threshold
+        self.cooldown_frames = cooldown_frames
+
+    def start(self, engine):
+        # Initial random tile assignment + per-tile cooldown counter
+        engine.current_idx = np.random.randint(0, engine.n_tiles, (engine.grid_h, engine.grid_w))
+        self.cooldown = np.zeros((engine.grid_h, engine.grid_w), np.int32)
+
+    def update(self, engine, small, small_lab):
+        motion_mask = self.motion(small)
+
+        # LAB colour distance between video + current tiles (whole grid)
+        delta = np.linalg.norm(small_lab - engine.tile_labs[engine.current_idx], axis=2)
+
+        # allowed only if cooldown is over AND motion OR colour deviation
+        update = (self.cooldown == 0) & (motion_mask | (delta >= self.stability_threshold))
+        update = engine.rematch(update, small_lab)
+
+        # apply cooldown to prevent tile flicker, then count it down
+        self.cooldown[update] = self.cooldown_frames
+        self.cooldown[self.cooldown > 0] -= 1
+
+    def take_over(self, engine, previous):
+        self.motion.take_over(previous.motion, engine.grid_h, engine.grid_w)
+        self.cooldown = resample_nearest(previous.cooldown, engine.grid_h, engine.grid_w)
+
+    def chunk_warmup(self, fps):
+        return self.motion.warmup_frames()
+
+    def chunk_align(self, fps):
+        return 1
+
+
+class SnapshotStrategy:
+    """Compare against a LAB snapshot taken every window; one flip per tile per window."""
+
+    uses_colour = True
+
+    def __init__(self, snap_seconds=0.8, colour_threshold=84):
+        self.snap_seconds = snap_seconds
+        self.colour_threshold = colour_threshold
+
+    def start(self, engine):
+        engine.current_idx = np.zeros((engine.grid_h, engine.grid_w), np.int32)
+        self.snap_frames = max(1, int(engine.fps * self.snap_seconds))
+        self.locked = np.zeros((engine.grid_h, engine.grid_w), np.bool_)
+        self.stale = np.zeros((engine.grid_h, engine.grid_w), np.bool_)
+        self.snapshot_lab = None
+
+    def update(self, engine, small, small_lab):
+        if engine.frame_no % self.snap_frames == 0:
+            # new window: snapshot, unlock, rebuild the mosaic from it
+            self.snapshot_lab = small_lab.copy()
+            self.locked[:] = False
+            if engine.max_updates is None:
+                engine.match_all(self.snapshot_lab)
+            else:
+                # live and capped: rebuild over the next frames instead
+                self.stale[:] = True
+
+        left = engine.max_updates
+        if self.stale.any():
+            # the rebuild goes first; whatever budget it leaves is for flips
+            done = engine.rematch(self.stale, self.snapshot_lab, avoid_current=False)
+            self.stale &= ~done
+            if left is not None:
+                left -= int(np.count_nonzero(done))
+
+        # compare the live frame to the snapshot; locked tiles already changed
+        delta = np.linalg.norm(small_lab - self.snapshot_lab, axis=2)
+        update = ~self.locked & (delta >= self.colour_threshold)
+        update = engine.rematch(update, small_lab, limit=left)
+        self.locked |= update
+        self.stale &= ~update
+
+    def take_over(self, engine, previous):
+        self.locked = resample_nearest(previous.locked, engine.grid_h, engine.grid_w)
+        self.stale = resample_nearest(previous.stale, engine.grid_h, engine.grid_w)
+        if previous.snapshot_lab is not None:
+            self.snapshot_lab = resample_area(previous.snapshot_lab, engine.grid_h, engine.grid_w)
+
+    def chunk_warmup(self, fps):
+        # a window start rebuilds everything, so aligned chunks need none
+        return 0
+
+    def chunk_align(self, fps):
+        return max(1, int(fps * self.snap_seconds))
+
+
+class MotionOnlyStrategy:
+    """Flip a tile to a random image wherever motion is detected, no colour."""
+
+    uses_colour = False
+
+    def __init__(self, bg_alpha=0.02, motion_threshold=32):
+        self.motion = MotionDetector(bg_alpha, motion_threshold)
+
+    def start(self, engine):
+        engine.current_idx = np.random.randint(0, engine.n_tiles, (engine.grid_h, engine.grid_w))
+
+    def update(self, engine, small, small_lab):
+        motion_mask = self.motion(small)
+        if engine.max_updates is not None:
+            # over budget: flip only a subset of the moving cells
+            cells = np.flatnonzero(motion_mask)
+            cells = np.random.permutation(cells)[:engine.max_updates]
+            engine.current_idx.flat[cells] = np.random.randint(0, engine.n_tiles, len(cells))
+            return
+        engine.current_idx[motion_mask] = np.random.randint(0, engine.n_tiles, np.count_nonzero(motion_mask))
+
+    def take_over(self, engine, previous):
+        self.motion.take_over(previous.motion, engine.grid_h, engine.grid_w)
+
+    def chunk_warmup(self, fps):
+        return self.motion.warmup_frames()
+
+    def chunk_align(self, fps):
+        return 1
@@ -0,0 +1,320 @@
+"""Frame timing for the Dorothy sketches.
+
+    profiler = FrameProfiler("ghosts", overlay=True)
+    dot.start_loop(*profiler.wrap(dot, setup, draw))
+
+    with profiler.stage("capture"):
+        frame = cap.read()
+
+Every named stage, plus "setup", "draw" and "frame" (the time between
+draw calls, i.e. 1 / real fps), goes into a log-spaced latency histogram:
+a stage costs two perf_counter calls and a bin increment. The optional
+overlay prints recent averages on the canvas, and the totals are written
+to <name>_timing.csv and <name>_timing.json when the sketch exits.
+
+FrameProfiler(enabled=False) hands out a shared do-nothing stage and
+leaves setup/draw unwrapped, so instrumented code can stay in place.
+
+run_frames(cap, writer, process) is the shared offline loop for the
+headless renderers (GhostsBatch, the mosaic package): decode, process and
+encode overlapped on a reader and a writer thread.
+"""
+import atexit
+import json
+import math
+import os
+import queue
+import threading
+import time
+
+BINS_PER_OCTAVE = 8           # ~9% bin width
+MIN_MS = 0.001                # first bin edge (1 µs)
+N_BINS = BINS_PER_OCTAVE * 24 # up to ~16 s
+RECENT = 0.05                 # EMA weight for the overlay's "recent" figure
+
+
+def bin_edge(b: int) -> float:
+    # upper edge (ms) of histogram bin b
+    return MIN_MS * 2.0 ** ((b + 1) / BINS_PER_OCTAVE)
+
+
+class StageTimer:
+    """Latency histogram for one named stage; also a context manager."""
+
+    __slots__ = ("name", "counts", "n", "total", "max", "recent", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = [0] * N_BINS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = 0.0
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.add((time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+    def add(self, ms: float) -> None:
+        self.n += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        b = 0 if ms <= MIN_MS else min(N_BINS - 1, int(math.log2(ms / MIN_MS) * BINS_PER_OCTAVE))
+        self.counts[b] += 1
+        self.recent += (ms - self.recent) * (RECENT if self.n > 1 else 1.0)
+
+    def percentile(self, q: float) -> float:
+        # upper edge of the bin holding the q-th percentile, capped at the max seen
+        if self.n == 0:
+            return 0.0
+        target = q / 100.0 * self.n
+        seen = 0
+        for b, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(bin_edge(b), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "stage": self.name,
+            "count": self.n,
+            "mean_ms": self.total / self.n if self.n else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+        }
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class FrameProfiler:
+    def __init__(self, name: str, enabled: bool = True, overlay: bool = False, dump_dir: str = "."):
+        self.name = name
+        self.enabled = enabled
+        self.overlay = overlay
+        self.dump_dir = dump_dir
+        self.stages = {}
+        self.last_draw = None
+        self.overlay_area = None   # (x1, y1, x2, y2) the overlay last drew over
+        if enabled:
+            atexit.register(self.dump)
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        timer = self.stages.get(name)
+        if timer is None:
+            timer = self.stages[name] = StageTimer(name)
+        return timer
+
+    def wrap(self, dot, setup, draw):
+        """Return (setup, draw) timed as stages "setup", "draw" and "frame"."""
+        if not self.enabled:
+            return setup, draw
+
+        def timed_setup():
+            with self.stage("setup"):
+                setup()
+
+        def timed_draw():
+            now = time.perf_counter()
+            if self.last_draw is not None:
+                self.stage("frame").add((now - self.last_draw) * 1000.0)
+            self.last_draw = now
+            with self.stage("draw"):
+                draw()
+            if self.overlay:
+                self.draw_overlay(dot)
+
+        return timed_setup, timed_draw
+
+    def draw_overlay(self, dot) -> None:
+        # recent average per stage, top-left of the canvas
+        import cv2
+
+        canvas = getattr(dot, "canvas", None)
+        if canvas is None or not self.stages:
+            return
+        lines = []
+        frame = self.stages.get("frame")
+        if frame is not None and frame.recent > 0:
+            lines.append(f"{1000.0 / frame.recent:5.1f} fps")
+        for timer in self.stages.values():
+            if timer.name not in ("frame", "setup"):
+                lines.append(f"{timer.name:<12}{timer.recent:6.2f} ms")
+
+        height = 16 * len(lines) + 8
+        canvas[:height, :210] //= 3
+        self.overlay_area = (0, 0, 209, height - 1)
+        for i, text in enumerate(lines):
+            cv2.putText(canvas, text, (6, 18 + 16 * i), cv2.FONT_HERSHEY_PLAIN, 1.0,
+                        (255, 255, 255), 1, cv2.LINE_AA)
+
+    def report(self) -> list:
+        return [timer.summary() for timer in self.stages.values()]
+
+    def dump(self) -> None:
+        # totals to CSV, totals + histograms to JSON
+        if not self.stages:
+            return
+        base = os.path.join(self.dump_dir, f"{self.name}_timing")
+        rows = self.report()
+        with open(base + ".csv", "w") as fh:
+            fh.write(",".join(rows[0].keys()) + "\n")
+            for row in rows:
+                fh.write(",".join(str(round(v, 4)) if isinstance(v, float) else str(v) for v in row.values()) + "\n")
+        payload = {
+            "sketch": self.name,
+            "bin_upper_edges_ms": [round(bin_edge(b), 6) for b in range(N_BINS)],
+            "stages": [dict(timer.summary(), histogram=timer.counts) for timer in self.stages.values()],
+        }
+        with open(base + ".json", "w") as fh:
+            json.dump(payload, fh, indent=1)
+        print(f"[PROFILE] {self.name}: wrote {base}.csv / .json")
+        for row in rows:
+            print(f"[PROFILE] {row['stage']:<14} n={row['count']:<6} mean {row['mean_ms']:.2f}  "
+                  f"p50 {row['p50_ms']:.2f}  p90 {row['p90_ms']:.2f}  p99 {row['p99_ms']:.2f}  max {row['max_ms']:.2f} ms")
+
+
+# end-of-stream marker passed down the queues
+_END = object()
+
+
+def _put(q, item, stop):
+    """Blocking put that gives up once stop is set; False if it gave up."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """Blocking get that returns None once stop is set and q is empty."""
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return None
+
+
+def _run_serial(cap, writer, process, progress):
+    count = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        writer.write(process(frame))
+        count += 1
+        if progress is not None:
+            progress(count)
+    return count
+
+
+def _run_threaded(cap, writer, process, queue_size, progress):
+    frames = queue.Queue(queue_size)
+    results = queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        # decode ahead of the process stage until the queue is full
+        try:
+            while not stop.is_set():
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if not _put(frames, frame, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(frames, _END, stop)
+
+    def write():
+        # encode in arrival order, which is frame order
+        try:
+            while True:
+                item = _get(results, stop)
+                if item is None or item is _END:
+                    return
+                writer.write(item)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    reader = threading.Thread(target=read, name="frames-reader", daemon=True)
+    encoder = threading.Thread(target=write, name="frames-writer", daemon=True)
+    reader.start()
+    encoder.start()
+
+    count = 0
+    try:
+        while True:
+            frame = _get(frames, stop)
+            if frame is None or frame is _END:
+                break
+            # process() may hand back a reused buffer, so queue a copy
+            if not _put(results, process(frame).copy(), stop):
+                break
+            count += 1
+            if progress is not None:
+                progress(count)
+        _put(results, _END, stop)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        reader.join()
+        encoder.join()
+
+    if errors:
+        raise errors[0]
+    return count
+
+
+def run_frames(cap, writer, process, threaded=True, queue_size=8, report=True, progress=None):
+    """Feed every frame of cap through process() and write the results in order.
+
+    threaded=True overlaps decoding, process() and encoding using a reader
+    and a writer thread joined by bounded queues; a full queue blocks the
+    faster side. If any stage raises, the others stop and the error is
+    re-raised here. Output matches the serial loop frame for frame.
+    progress(count) is called after each processed frame. Returns the
+    number of frames written.
+    """
+    start = time.perf_counter()
+    if threaded:
+        count = _run_threaded(cap, writer, process, queue_size, progress)
+    else:
+        count = _run_serial(cap, writer, process, progress)
+    elapsed = time.perf_counter() - start
+
+    if report:
+        fps = count / elapsed if elapsed > 0 else 0.0
+        mode = "threaded" if threaded else "serial"
+        print(f"[PIPE] {count} frames in {elapsed:.1f}s ({fps:.1f} fps, {mode})")
+    return count